@@ -1,8 +1,11 @@
 import cv2
 import numpy as np
-from flask import Flask, render_template, Response, jsonify
+from flask import Flask, render_template, Response, jsonify, request
 from flask_cors import CORS
 from asl_classifier import ASLClassifier
+from recognition_service import RecognitionService, mjpeg_stream, prediction_events
+from prediction_smoother import PredictionStabilizer
+from stage_metrics import metrics
 
 app = Flask(__name__)
 CORS(app)
@@ -10,65 +13,44 @@ CORS(app)
 # Initialize ASL classifier
 classifier = ASLClassifier()
 
-# Global variables
-current_letter = "None"
-confidence = 0.0
+def annotate_frame(frame, prediction):
+    """Draw landmarks and the current prediction onto a frame
 
-def process_frame(frame):
-    """Process a single frame for ASL recognition"""
-    global current_letter, confidence
-    
-    # Process frame with classifier
-    letter, conf, hand_landmarks = classifier.process_frame(frame)
-    
-    # Update global variables
-    current_letter = letter
-    confidence = conf
-    
+    The service hands over the stabilized letter, the one /get_letter reports.
+    """
     # Draw landmarks if hand detected
-    if hand_landmarks:
-        frame = classifier.draw_landmarks(frame, hand_landmarks)
+    if prediction.hand_landmarks:
+        with metrics.time('draw_landmarks'):
+            frame = classifier.draw_landmarks(frame, prediction.hand_landmarks)
+    
+    with metrics.time('put_text'):
+        # Add text overlay
+        cv2.putText(frame, f"Letter: {prediction.letter}", (10, 30),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.putText(frame, f"Confidence: {prediction.confidence:.2f}", (10, 70),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        
+        # Add instructions
+        cv2.putText(frame, "Make ASL signs clearly", (10, 110),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
     
     return frame
 
-def generate_frames():
+# Stream encoding settings (per-client ?fps= can lower the rate further)
+STREAM_JPEG_QUALITY = 80
+STREAM_MAX_WIDTH = 960
+STREAM_TARGET_FPS = 30
+
+# One capture + inference thread shared by every viewer
+service = RecognitionService(classifier, source=0, annotate=annotate_frame,
+                             jpeg_quality=STREAM_JPEG_QUALITY,
+                             max_width=STREAM_MAX_WIDTH,
+                             target_fps=STREAM_TARGET_FPS,
+                             stabilizer=PredictionStabilizer())
+
+def generate_frames(max_fps=None):
     """Generate video frames for streaming"""
-    cap = cv2.VideoCapture(0)
-    
-    if not cap.isOpened():
-        print("Error: Could not open webcam")
-        return
-    
-    try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Process frame for ASL recognition
-            processed_frame = process_frame(frame)
-            
-            # Add text overlay
-            cv2.putText(processed_frame, f"Letter: {current_letter}", (10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.putText(processed_frame, f"Confidence: {confidence:.2f}", (10, 70),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            
-            # Add instructions
-            cv2.putText(processed_frame, "Make ASL signs clearly", (10, 110),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-            
-            # Convert to JPEG
-            ret, buffer = cv2.imencode('.jpg', processed_frame)
-            if not ret:
-                continue
-            
-            frame_data = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_data + b'\r\n')
-    
-    finally:
-        cap.release()
+    return mjpeg_stream(service, max_fps=max_fps)
 
 @app.route('/')
 def index():
@@ -78,17 +60,33 @@ def index():
 @app.route('/video_feed')
 def video_feed():
     """Video streaming route"""
-    return Response(generate_frames(),
+    max_fps = request.args.get('fps', type=float)
+    return Response(generate_frames(max_fps),
                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/get_letter')
 def get_letter():
     """API endpoint to get current letter and confidence"""
+    current_letter, confidence = service.latest_prediction()
     return jsonify({
         'letter': current_letter,
         'confidence': confidence
     })
 
+@app.route('/letter_stream')
+def letter_stream():
+    """Server-Sent Events stream of prediction changes (?rate= max events/sec)"""
+    max_rate = request.args.get('rate', default=10.0, type=float)
+    return Response(prediction_events(service, max_rate=max_rate),
+                   mimetype='text/event-stream',
+                   headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Per-stage latencies and frame counters in Prometheus text format"""
+    return Response(metrics.prometheus_text(),
+                   content_type='text/plain; version=0.0.4; charset=utf-8')
+
 if __name__ == '__main__':
     print("Starting ASL Recognition App...")
     print("Open your browser and go to: http://localhost:5000")
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Batch Score - label recorded signing sessions without a camera or window
+Streams frames from video files and image folders through
+TrainedASLClassifier in a pool of worker processes, one file (or chunk of
+images) per task. Workers run hand detection frame by frame but collect
+the landmark rows and classify them with one classify_batch() call per
+--batch-size rows. Rows go to part files as they are classified, so
+memory stays bounded however long a video is; the parts are then merged
+into one CSV, or Parquet when pyarrow is installed.
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from trained_asl_recognition import DEFAULT_MODEL_PATH, TrainedASLClassifier
+
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v']
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+COLUMNS = ['source', 'frame', 'time_ms', 'letter', 'confidence', 'hand_detected']
+
+# Per-worker state, created once by _init_worker
+_worker = {}
+
+def collect_jobs(inputs, images_per_job=256):
+    """Split the inputs into tasks: one per video, chunks of images per folder"""
+    jobs = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files = sorted(p for p in path.rglob('*') if p.is_file())
+            videos = [str(p) for p in files if p.suffix.lower() in VIDEO_EXTENSIONS]
+            images = [str(p) for p in files if p.suffix.lower() in IMAGE_EXTENSIONS]
+            jobs += [('video', video) for video in videos]
+            for start in range(0, len(images), images_per_job):
+                jobs.append(('images', images[start:start + images_per_job]))
+        elif path.suffix.lower() in IMAGE_EXTENSIONS:
+            jobs.append(('images', [str(path)]))
+        elif path.exists():
+            jobs.append(('video', str(path)))
+        else:
+            print(f"✗ Skipping {item}: not found")
+    return jobs
+
+def _init_worker(model_path, max_width):
+    """Load the model once per worker process"""
+    # One process per core already; keep OpenCV from spawning its own threads
+    cv2.setNumThreads(1)
+    _worker['classifier'] = TrainedASLClassifier(model_path)
+    _worker['max_width'] = max_width
+    _worker['static_hands'] = None
+
+def _detect_frame(frame):
+    """((1, 63) landmark row or None, handedness label) for one BGR frame"""
+    classifier = _worker['classifier']
+    max_width = _worker['max_width']
+    if max_width and frame.shape[1] > max_width:
+        height = int(frame.shape[0] * max_width / frame.shape[1])
+        frame = cv2.resize(frame, (max_width, height), interpolation=cv2.INTER_AREA)
+    results = classifier.hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    if not results.multi_hand_landmarks:
+        return None, None
+    handedness = None
+    if results.multi_handedness:
+        handedness = results.multi_handedness[0].classification[0].label
+    return classifier.extract_landmarks(results.multi_hand_landmarks[0]), handedness
+
+def _classify_rows(pending):
+    """Output rows for [(row prefix, landmark row, handedness)], classified in one batch
+
+    Returns (rows, classified, seconds): the rows classified by the model
+    and the time classify_batch() took on them.
+    """
+    classifier = _worker['classifier']
+    detected = [i for i, (_, features, _) in enumerate(pending) if features is not None]
+    results = [("None", 0.0)] * len(pending)
+    classified = 0
+    seconds = 0.0
+    if detected and classifier.model is not None:
+        matrix = np.vstack([pending[i][1] for i in detected])
+        labels = [pending[i][2] for i in detected]
+        # '' is neither hand, as in InferenceScheduler
+        handedness = None if not any(labels) else [label or '' for label in labels]
+        started = time.perf_counter()
+        letters, confidences = classifier.classify_batch(matrix, handedness)
+        seconds = time.perf_counter() - started
+        classified = len(detected)
+        for i, letter, confidence in zip(detected, letters, confidences):
+            results[i] = (str(letter), float(confidence))
+    else:
+        for i in detected:
+            results[i] = classifier.classify_letter_fallback(pending[i][1])
+    rows = [[*prefix, letter, round(float(confidence), 4), int(features is not None)]
+            for (prefix, features, _), (letter, confidence) in zip(pending, results)]
+    return rows, classified, seconds
+
+def _score_job(job_index, job, part_dir, stride, batch_size=256):
+    """Score one task into its own CSV part file
+
+    Returns (index, part_path, rows, classified, classify_seconds), the
+    last two counting the rows the model classified and its time on them.
+    """
+    kind, target = job
+    classifier = _worker['classifier']
+    part_path = os.path.join(part_dir, f"part-{job_index:06d}.csv")
+    rows = 0
+    classified = 0
+    classify_seconds = 0.0
+    pending = []
+
+    with open(part_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+
+        def flush():
+            nonlocal rows, classified, classify_seconds
+            if pending:
+                scored, n, seconds = _classify_rows(pending)
+                writer.writerows(scored)
+                rows += len(scored)
+                classified += n
+                classify_seconds += seconds
+                pending.clear()
+
+        def emit(prefix, frame):
+            pending.append((prefix, *_detect_frame(frame)))
+            if len(pending) >= batch_size:
+                flush()
+
+        if kind == 'video':
+            # Tracking state must not leak from the previous video
+            classifier.hands.reset()
+            cap = cv2.VideoCapture(target)
+            frame_index = 0
+            while True:
+                # grab() skips decoding of the frames we are not scoring
+                if not cap.grab():
+                    break
+                if frame_index % stride == 0:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        time_ms = round(cap.get(cv2.CAP_PROP_POS_MSEC), 1)
+                        emit([target, frame_index, time_ms], frame)
+                frame_index += 1
+            cap.release()
+        else:
+            # Unrelated stills: detect every image from scratch
+            if _worker['static_hands'] is None:
+                _worker['static_hands'] = classifier.mp_hands.Hands(
+                    static_image_mode=True,
+                    model_complexity=0,
+                    min_detection_confidence=0.7,
+                    max_num_hands=1
+                )
+            video_hands = classifier.hands
+            classifier.hands = _worker['static_hands']
+            try:
+                for image_path in target:
+                    frame = cv2.imread(image_path)
+                    if frame is None:
+                        continue
+                    emit([image_path, 0, ''], frame)
+            finally:
+                classifier.hands = video_hands
+
+        flush()
+    return job_index, part_path, rows, classified, classify_seconds
+
+def merge_csv(parts, output_path):
+    """Concatenate the part files, in task order, under one header"""
+    with open(output_path, 'w', newline='') as out:
+        csv.writer(out).writerow(COLUMNS)
+        for part in parts:
+            with open(part, newline='') as f:
+                shutil.copyfileobj(f, out)
+
+def merge_parquet(parts, output_path):
+    """Stream the part files into one Parquet file, batch by batch"""
+    schema = pa.schema([
+        ('source', pa.string()),
+        ('frame', pa.int64()),
+        ('time_ms', pa.float64()),
+        ('letter', pa.string()),
+        ('confidence', pa.float32()),
+        ('hand_detected', pa.bool_()),
+    ])
+    read_options = pa_csv.ReadOptions(column_names=COLUMNS)
+    convert_options = pa_csv.ConvertOptions(column_types=schema, strings_can_be_null=True)
+    with pq.ParquetWriter(output_path, schema) as writer:
+        for part in parts:
+            if os.path.getsize(part) == 0:
+                continue
+            reader = pa_csv.open_csv(part, read_options=read_options,
+                                     convert_options=convert_options)
+            for batch in reader:
+                writer.write_batch(batch)
+
+def main():
+    parser = argparse.ArgumentParser(description='Score recorded videos and image folders offline')
+    parser.add_argument('inputs', nargs='+', help='Video files, images or folders of either')
+    parser.add_argument('--output', default='predictions.csv',
+                        help='Output file (.csv, or .parquet with pyarrow installed)')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Model bundle to use')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Worker processes (0 = one per CPU core)')
+    parser.add_argument('--stride', type=int, default=1, help='Score every Nth video frame')
+    parser.add_argument('--max-width', type=int, default=None, help='Downscale wider frames first')
+    parser.add_argument('--images-per-job', type=int, default=256,
+                        help='Images handed to a worker at a time')
+    parser.add_argument('--batch-size', type=int, default=256,
+                        help='Landmark rows classified per classify_batch() call')
+    args = parser.parse_args()
+
+    parquet = args.output.lower().endswith('.parquet')
+    if parquet and pa is None:
+        print("✗ Parquet output needs pyarrow (pip install pyarrow); use a .csv output instead")
+        return
+
+    jobs = collect_jobs(args.inputs, args.images_per_job)
+    if not jobs:
+        print("✗ Nothing to score")
+        return
+
+    workers = args.workers or os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    print(f"Scoring {len(jobs)} tasks with {workers} workers...")
+
+    start = time.perf_counter()
+    part_dir = tempfile.mkdtemp(prefix='asl_batch_')
+    parts = [None] * len(jobs)
+    total_rows = 0
+    total_classified = 0
+    classify_seconds = 0.0
+    try:
+        # spawn: MediaPipe state must not be inherited through fork
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker,
+                                 initargs=(args.model, args.max_width)) as executor:
+            futures = [executor.submit(_score_job, i, job, part_dir, max(1, args.stride),
+                                       max(1, args.batch_size))
+                       for i, job in enumerate(jobs)]
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    index, part_path, rows, classified, seconds = future.result()
+                except Exception as e:
+                    print(f"✗ Task failed: {e}")
+                    continue
+                parts[index] = part_path
+                total_rows += rows
+                total_classified += classified
+                classify_seconds += seconds
+                print(f"  [{done}/{len(jobs)}] {rows} frames")
+
+        parts = [part for part in parts if part is not None]
+        if parquet:
+            merge_parquet(parts, args.output)
+        else:
+            merge_csv(parts, args.output)
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ {total_rows} frames scored in {elapsed:.1f}s "
+          f"({total_rows / elapsed:.1f} frames/s), written to {args.output}")
+    if classify_seconds:
+        print(f"  model: {total_classified} hands classified in {classify_seconds * 1000:.1f} ms "
+              f"({total_classified / classify_seconds:.0f} rows/s in batches of up to "
+              f"{args.batch_size})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Benchmark Pipeline - replay recorded frames through the recognizers
+Streams the frames of a video file or image folder, one at a time,
+through ASLClassifier, QuickASLClassifier and TrainedASLClassifier without a
+camera. Reports frames/sec, per-stage latency percentiles, peak RSS and
+model load time, and writes JSON that can be compared between commits.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from stage_metrics import metrics
+
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+CLASSIFIER_NAMES = ['asl', 'asl-640', 'quick', 'trained']
+
+def iter_frames(source, limit=None, max_width=None):
+    """Yield up to `limit` BGR frames from a video file or image folder, one at a time
+
+    Frames are decoded as they are consumed, so memory does not grow with
+    the length of the recording.
+    """
+    count = 0
+    if os.path.isdir(source):
+        paths = sorted(p for p in Path(source).rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+        frames = (cv2.imread(str(path)) for path in paths)
+    else:
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video {source}")
+        frames = _read_capture(cap)
+    for frame in frames:
+        if limit and count >= limit:
+            break
+        if frame is None:
+            continue
+        if max_width and frame.shape[1] > max_width:
+            height = int(frame.shape[0] * max_width / frame.shape[1])
+            frame = cv2.resize(frame, (max_width, height), interpolation=cv2.INTER_AREA)
+        count += 1
+        yield frame
+
+def _read_capture(cap):
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            yield frame
+    finally:
+        cap.release()
+
+def build_classifier(name, model_path=None, scheduler=None):
+    """Create one of the recognizers by benchmark name
+
+    scheduler is an InferenceScheduler for the trained classifier to share.
+    """
+    if name == 'asl':
+        from asl_classifier import ASLClassifier
+        return ASLClassifier()
+    if name == 'asl-640':
+        from asl_classifier import ASLClassifier
+        return ASLClassifier(detect_width=640)
+    if name == 'quick':
+        from quick_asl import QuickASLClassifier
+        return QuickASLClassifier()
+    if name == 'trained':
+        from trained_asl_recognition import DEFAULT_MODEL_PATH, TrainedASLClassifier
+        return TrainedASLClassifier(model_path or DEFAULT_MODEL_PATH, scheduler=scheduler)
+    raise ValueError(f"Unknown classifier: {name}")
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, if the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+def latency_summary(seconds):
+    """Percentiles of a list of durations, in milliseconds"""
+    values = np.asarray(seconds, dtype=np.float64) * 1000
+    if not len(values):
+        return {}
+    p50, p95, p99 = np.quantile(values, [0.5, 0.95, 0.99])
+    return {
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'mean_ms': round(float(values.mean()), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+
+def run_benchmark(name, source, limit=None, warmup=10, max_width=None, model_path=None):
+    """Benchmark one classifier on the frames of `source`; returns a result dict
+
+    The first `warmup` frames are processed untimed, then up to `limit`
+    frames are timed. Frames are streamed from the source, so the RSS
+    figures cover the classifier rather than a buffer of decoded frames;
+    rss_growth_mb is how far the peak rose from before the model load.
+    """
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    classifier = build_classifier(name, model_path)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    frames = iter_frames(source, limit + warmup if limit else None, max_width)
+    # Warm-up frames let MediaPipe and the caches settle; they are not timed
+    warmed = 0
+    frame_size = None
+    for frame in frames if warmup else ():
+        frame_size = list(frame.shape[:2])
+        classifier.process_frame(frame)
+        warmed += 1
+        if warmed >= warmup:
+            break
+    metrics.reset()
+
+    frame_times = []
+    letters = Counter()
+    hands = 0
+    while True:
+        started = time.perf_counter()
+        frame = next(frames, None)
+        if frame is None:
+            break
+        metrics.record('decode', time.perf_counter() - started)
+        frame_size = list(frame.shape[:2])
+        started = time.perf_counter()
+        letter, confidence, hand_landmarks = classifier.process_frame(frame)
+        frame_times.append(time.perf_counter() - started)
+        if hand_landmarks is not None:
+            hands += 1
+        letters[letter] += 1
+    if not frame_times:
+        raise ValueError(f"No frames found in {source} after {warmed} warm-up frames")
+
+    peak = peak_rss_mb()
+    result = {
+        'classifier': name,
+        'frames': len(frame_times),
+        'warmup': warmed,
+        'frame_size': frame_size,
+        'load_ms': round(load_ms, 1),
+        # Classification only; decoding is reported as its own stage
+        'fps': round(len(frame_times) / sum(frame_times), 2),
+        'frame_latency': latency_summary(frame_times),
+        'stages': metrics.snapshot()['stages'],
+        'hands_detected': hands,
+        'letters': dict(letters.most_common()),
+        'peak_rss_mb': peak,
+        'rss_growth_mb': None if peak is None else round(peak - rss_before, 1),
+    }
+    gate = getattr(classifier, 'gate', None)
+    if gate is not None:
+        result['gate_hit_rate'] = round(gate.hit_rate, 3)
+    return result
+
+def environment_info(source):
+    """Where and on what the benchmark ran"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    try:
+        import mediapipe
+        mediapipe_version = mediapipe.__version__
+    except ImportError:
+        mediapipe_version = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'source': str(source),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'mediapipe': mediapipe_version,
+    }
+
+def compare_results(baseline, current, threshold=10.0):
+    """Print fps/latency changes against a previous run
+
+    Returns the names of classifiers whose fps dropped by more than
+    threshold percent.
+    """
+    print(f"\nComparison with {baseline['environment'].get('commit') or 'baseline'}:")
+    regressions = []
+    for name, result in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            print(f"  {name}: no baseline")
+            continue
+        fps_change = (result['fps'] - old['fps']) / old['fps'] * 100 if old['fps'] else 0.0
+        p95_old = old['frame_latency'].get('p95_ms', 0.0)
+        p95_new = result['frame_latency'].get('p95_ms', 0.0)
+        marker = ""
+        if fps_change < -threshold:
+            marker = "  ✗ regression"
+            regressions.append(name)
+        print(f"  {name}: {old['fps']:.1f} → {result['fps']:.1f} fps ({fps_change:+.1f}%), "
+              f"p95 {p95_old:.2f} → {p95_new:.2f} ms{marker}")
+    return regressions
+
+def print_result(result):
+    """Human-readable report for one classifier"""
+    latency = result['frame_latency']
+    print(f"\n{result['classifier']}: {result['fps']:.1f} fps over {result['frames']} frames "
+          f"(load {result['load_ms']:.0f} ms, peak RSS {result['peak_rss_mb']} MB, "
+          f"+{result.get('rss_growth_mb')} MB for the classifier)")
+    print(f"  frame: p50 {latency['p50_ms']:.2f} ms, p95 {latency['p95_ms']:.2f} ms, "
+          f"p99 {latency['p99_ms']:.2f} ms")
+    for stage, stats in sorted(result['stages'].items(), key=lambda item: -item[1]['p50_ms']):
+        print(f"  {stage}: p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms")
+    print(f"  hands detected in {result['hands_detected']}/{result['frames']} frames")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ASL recognizers on recorded frames')
+    parser.add_argument('source', help='Video file or folder of images')
+    parser.add_argument('--classifiers', nargs='+', choices=CLASSIFIER_NAMES,
+                        default=['asl', 'quick', 'trained'], help='Recognizers to benchmark')
+    parser.add_argument('--model', default=None, help='Model bundle for the trained classifier')
+    parser.add_argument('--frames', type=int, default=300, help='Maximum frames to time (0 = all)')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed frames before measuring')
+    parser.add_argument('--max-width', type=int, default=None, help='Downscale wider frames first')
+    parser.add_argument('--output', default=None, help='Write results to this JSON file')
+    parser.add_argument('--compare', default=None, help='Previous results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='fps drop in percent that counts as a regression')
+    parser.add_argument('--in-process', action='store_true',
+                        help='Run every classifier in this process (peak RSS is then shared)')
+    args = parser.parse_args()
+
+    report = {'environment': environment_info(args.source), 'results': {}}
+    limit = args.frames or None
+
+    for name in args.classifiers:
+        print(f"Benchmarking {name}...")
+        job = (name, args.source, limit, args.warmup, args.max_width, args.model)
+        try:
+            if args.in_process:
+                result = run_benchmark(*job)
+            else:
+                # A fresh process per classifier gives a cold load time and its own peak RSS
+                with ProcessPoolExecutor(max_workers=1,
+                                         mp_context=multiprocessing.get_context("spawn")) as executor:
+                    result = executor.submit(run_benchmark, *job).result()
+        except Exception as e:
+            print(f"✗ {name} failed: {e}")
+            continue
+        report['results'][name] = result
+        print_result(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare_results(baseline, report, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Bridge Load Test - run the spelling game against simulated ESP32 boards
+Replays the bridged recognizer's per-frame loop without a camera or window:
+frames from a recorded video go through TrainedASLClassifier while one or
+more ESP32Simulator boards hand out words. By default a scripted signer
+produces each expected letter after a fixed time, so sessions progress
+whatever the video shows; --signer video uses the stabilized predictions
+instead. Reports words/minute, word and servo completion latency and how
+far the host and board queues back up.
+"""
+
+import argparse
+import json
+import time
+
+from benchmark_pipeline import iter_frames, latency_summary
+from bridge_protocol import FramedSerialBridge
+from esp32_simulator import ESP32Simulator
+from prediction_smoother import PredictionStabilizer, StableEvent
+from serial_bridge import SerialBridge
+from spelling_game import SPELLING, WAITING_FOR_DONE, WAITING_FOR_WORD, SpellingGame
+from stage_metrics import metrics
+
+class Session:
+    """One simulated board, its bridge and spelling game"""
+
+    def __init__(self, simulator, bridge, game, letter_time=0.6, stabilizer=None):
+        self.simulator = simulator
+        self.bridge = bridge
+        self.game = game
+        self.letter_time = letter_time
+        # None for the scripted signer
+        self.stabilizer = stabilizer
+
+        self._word_started = None
+        self._servo_started = None
+        self._next_letter_at = 0.0
+        self.word_latencies = []
+        self.done_latencies = []
+        self.host_backlog = []
+        self.device_backlog = []
+
+    def step(self, now, letter, confidence, proba=None):
+        """Advance the game by one frame"""
+        game = self.game
+        if self.stabilizer is not None:
+            event = self.stabilizer.update(letter, confidence, proba, timestamp=now)
+        elif game.next_letter is not None and now >= self._next_letter_at:
+            event = StableEvent(game.next_letter, 0.9, now, None)
+        else:
+            event = None
+
+        before = game.state
+        timeouts = game.done_timeouts
+        accepted = game.update(event)
+        after = game.state
+
+        if accepted:
+            self._next_letter_at = now + self.letter_time
+        if before == WAITING_FOR_WORD and after == SPELLING:
+            self._word_started = now
+            self._next_letter_at = now + self.letter_time
+            if self.stabilizer is not None:
+                self.stabilizer.reset()
+        elif before == SPELLING and after == WAITING_FOR_DONE:
+            self._servo_started = now
+        elif before == WAITING_FOR_DONE and after == WAITING_FOR_WORD and game.done_timeouts == timeouts:
+            self.word_latencies.append(now - self._word_started)
+            self.done_latencies.append(now - self._servo_started)
+
+        stats = self.bridge.stats()
+        self.host_backlog.append(stats['words_queued'] + stats.get('queued', 0)
+                                 + stats.get('in_flight', 0))
+        self.device_backlog.append(self.simulator.backlog)
+
+    def close(self):
+        self.bridge.stop()
+        self.bridge.ser.close()
+        self.simulator.stop()
+
+def open_session(index, args, classes=None):
+    """Start a simulated board and connect a bridge and game to it"""
+    seed = None if args.seed is None else args.seed + index
+    simulator = ESP32Simulator(args.words, args.transport, args.protocol, args.servo_time,
+                               args.word_latency, args.link_latency, args.jitter, args.loss,
+                               seed=seed).start()
+    port = simulator.open_port()
+    bridge_class = FramedSerialBridge if args.protocol == 'framed' else SerialBridge
+    bridge = bridge_class(port).start()
+    game = SpellingGame(bridge, done_timeout=args.done_timeout, verbose=args.verbose)
+    stabilizer = None
+    if args.signer == 'video':
+        stabilizer = PredictionStabilizer(classes=classes, enter_threshold=0.4,
+                                          exit_threshold=0.25)
+    return Session(simulator, bridge, game, args.letter_time, stabilizer)
+
+def looping_frames(source, limit=None, max_width=None):
+    """Stream (frame, first_of_pass) forever, starting over after `limit` frames or the end"""
+    while True:
+        count = 0
+        for frame in iter_frames(source, limit, max_width):
+            yield frame, count == 0
+            count += 1
+        if not count:
+            raise ValueError(f"No frames found in {source}")
+
+def backlog_summary(samples):
+    if not samples:
+        return {'max': 0, 'mean': 0.0}
+    return {'max': max(samples), 'mean': round(sum(samples) / len(samples), 3)}
+
+def run_load_test(args):
+    """Run the sessions for args.duration seconds; returns the report dict"""
+    classifier = None
+    frames = None
+    if args.video:
+        from trained_asl_recognition import DEFAULT_MODEL_PATH, TrainedASLClassifier
+        frames = looping_frames(args.video, args.frames or None, args.max_width)
+        classifier = TrainedASLClassifier(args.model or DEFAULT_MODEL_PATH)
+    elif args.signer == 'video':
+        raise ValueError("--signer video needs a video to recognize")
+
+    classes = classifier.classes if classifier is not None else None
+    sessions = [open_session(i, args, classes) for i in range(args.sessions)]
+    period = 1.0 / args.fps if args.fps else 0.0
+    frame_times = []
+    metrics.reset()
+    start = time.monotonic()
+    try:
+        while True:
+            now = time.monotonic()
+            if now - start >= args.duration:
+                break
+            letter, confidence, proba = "None", 0.0, None
+            if classifier is not None:
+                frame, first_of_pass = next(frames)
+                if first_of_pass:
+                    # Looping the video: tracking must not carry over the cut
+                    classifier.hands.reset()
+                    if classifier.gate is not None:
+                        classifier.gate.reset()
+                letter, confidence, _ = classifier.process_frame(frame)
+                proba = classifier.last_proba
+            for session in sessions:
+                session.step(now, letter, confidence, proba)
+            elapsed = time.monotonic() - now
+            frame_times.append(elapsed)
+            if period > elapsed:
+                time.sleep(period - elapsed)
+        duration = time.monotonic() - start
+        report = build_report(args, sessions, frame_times, duration)
+    finally:
+        for session in sessions:
+            session.close()
+    return report
+
+def build_report(args, sessions, frame_times, duration):
+    words = sum(session.game.words_completed for session in sessions)
+    word_latencies = [t for session in sessions for t in session.word_latencies]
+    done_latencies = [t for session in sessions for t in session.done_latencies]
+    host_backlog = [n for session in sessions for n in session.host_backlog]
+    device_backlog = [n for session in sessions for n in session.device_backlog]
+
+    bridge_totals = {}
+    simulator_totals = {}
+    for session in sessions:
+        for totals, stats in ((bridge_totals, session.bridge.stats()),
+                              (simulator_totals, session.simulator.stats())):
+            for key, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                if key.startswith('max_'):
+                    totals[key] = max(totals.get(key, 0), value)
+                else:
+                    totals[key] = totals.get(key, 0) + value
+    bridge_totals.pop('ack_rtt_ms', None)
+    rtts = [session.bridge.stats().get('ack_rtt_ms') for session in sessions]
+    rtts = [rtt for rtt in rtts if rtt is not None]
+
+    return {
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'duration_s': round(duration, 2),
+        'frames': len(frame_times),
+        'loop_fps': round(len(frame_times) / duration, 2) if duration else 0.0,
+        'frame_latency': latency_summary(frame_times),
+        'words_completed': words,
+        'words_per_minute': round(words * 60.0 / duration, 2) if duration else 0.0,
+        'words_per_minute_per_session': round(words * 60.0 / duration / len(sessions), 2) if duration else 0.0,
+        'done_timeouts': sum(session.game.done_timeouts for session in sessions),
+        'word_latency': latency_summary(word_latencies),
+        'servo_to_done_latency': latency_summary(done_latencies),
+        'host_backlog': backlog_summary(host_backlog),
+        'device_backlog': backlog_summary(device_backlog),
+        'ack_rtt_ms': round(sum(rtts) / len(rtts), 2) if rtts else None,
+        'bridge': bridge_totals,
+        'simulator': simulator_totals,
+        'stages': metrics.snapshot()['stages'],
+    }
+
+def print_report(report):
+    print(f"\n{report['words_completed']} words in {report['duration_s']:.0f}s across "
+          f"{report['config']['sessions']} session(s): {report['words_per_minute']:.1f} words/min "
+          f"({report['words_per_minute_per_session']:.1f} per session), "
+          f"{report['done_timeouts']} DONE timeouts")
+    print(f"Loop: {report['loop_fps']:.1f} fps over {report['frames']} frames")
+    for name in ('word_latency', 'servo_to_done_latency', 'frame_latency'):
+        summary = report[name]
+        if summary:
+            print(f"  {name}: p50 {summary['p50_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms, "
+                  f"max {summary['max_ms']:.1f} ms")
+    print(f"  host backlog: max {report['host_backlog']['max']}, mean {report['host_backlog']['mean']}")
+    print(f"  board backlog: max {report['device_backlog']['max']}, mean {report['device_backlog']['mean']}")
+    if report['ack_rtt_ms'] is not None:
+        print(f"  ack round-trip: {report['ack_rtt_ms']} ms")
+    print(f"  bridge: {report['bridge']}")
+    print(f"  board: {report['simulator']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the ESP32 bridge with simulated boards')
+    parser.add_argument('video', nargs='?', default=None,
+                        help='Recorded video (or image folder) to recognize each frame; '
+                             'omit to exercise the bridge alone')
+    parser.add_argument('--model', default=None, help='Model bundle for the trained classifier')
+    parser.add_argument('--frames', type=int, default=300,
+                        help='Frames of the video to play before starting over (0 = all)')
+    parser.add_argument('--max-width', type=int, default=None, help='Downscale wider frames first')
+    parser.add_argument('--duration', type=float, default=60.0, help='Seconds to run')
+    parser.add_argument('--fps', type=float, default=30.0, help='Frame rate to pace the loop at (0 = unpaced)')
+    parser.add_argument('--sessions', type=int, default=1, help='Simulated boards, each with its own game')
+    parser.add_argument('--signer', choices=['scripted', 'video'], default='scripted',
+                        help='Where accepted letters come from')
+    parser.add_argument('--letter-time', type=float, default=0.6,
+                        help='Seconds the scripted signer takes per letter')
+    parser.add_argument('--transport', choices=['pty', 'socket'], default='pty')
+    parser.add_argument('--protocol', choices=['text', 'framed'], default='text')
+    parser.add_argument('--words', nargs='+', default=None, help='Words the boards hand out')
+    parser.add_argument('--servo-time', type=float, default=4.0, help='Seconds SERVO keeps a board busy')
+    parser.add_argument('--word-latency', type=float, default=1.0, help='Seconds to "fetch" each word')
+    parser.add_argument('--link-latency', type=float, default=0.0, help='One-way delay of board messages')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many seconds added to each delay')
+    parser.add_argument('--loss', type=float, default=0.0, help='Probability that a message is lost')
+    parser.add_argument('--done-timeout', type=float, default=15.0, help="Seconds the game waits for DONE")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true', help='Print the game messages')
+    parser.add_argument('--output', default=None, help='Write the report to this JSON file')
+    args = parser.parse_args()
+
+    print(f"Load test: {args.sessions} session(s), {args.protocol} protocol over {args.transport}, "
+          f"{args.duration:.0f}s...")
+    try:
+        report = run_load_test(args)
+    except (ValueError, RuntimeError) as e:
+        print(f"✗ {e}")
+        return
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,597 @@
+#!/usr/bin/env python3
+"""
+Bridge Protocol - framed, acknowledged messages for the ESP32 link
+Each message travels as one COBS-encoded frame ended by a zero byte:
+
+    type (1 byte) | seq (1 byte) | body | CRC-16/CCITT (2 bytes, big-endian)
+
+DATA frames carry the same text messages as the line protocol (WORD:...,
+DONE, SERVO, LED_BLINK) and are answered with an ACK frame holding the
+same seq. Garbled frames fail the CRC and are dropped; the sender resends
+anything not acknowledged in time. Up to `window` DATA frames may be
+unacknowledged at once, so several commands go out per round-trip. The
+receiver acknowledges duplicates again but delivers them only once, and
+holds frames that overtook a lost one until the gap is filled, so
+messages are delivered in the order they were sent.
+
+Each end opens a session by sending RESET until it gets RESET_ACK, and
+only then sends DATA numbered from 0. A RESET makes the receiver expect
+seq 0 from that end again, so a rebooted board or a restarted host is not
+mistaken for a stream of duplicates. A sender that gives up on a DATA
+frame sends a SKIP with the same seq in its place, which the receiver
+acknowledges and steps over, so the frames held behind the gap are
+released. Only if the SKIP is not acknowledged either does the sender
+open a new session.
+
+encode_frame()/FrameDecoder are the reference codec for the firmware
+side, FramedSession the reference state machine, and PtyLoopback a local
+stand-in device for testing without a board.
+"""
+
+import binascii
+import collections
+import os
+import threading
+import time
+
+from serial_bridge import SerialBridge
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+MSG_DATA = 0x01
+MSG_ACK = 0x02
+MSG_RESET = 0x03
+MSG_RESET_ACK = 0x04
+MSG_SKIP = 0x05
+SEQ_MODULO = 256
+MAX_BODY = 250
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF)"""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+def cobs_encode(data):
+    """Consistent Overhead Byte Stuffing: the result contains no zero bytes"""
+    out = bytearray(b'\x00')
+    code_index = 0
+    code = 1
+    for byte in data:
+        if byte:
+            out.append(byte)
+            code += 1
+        if not byte or code == 0xFF:
+            out[code_index] = code
+            code_index = len(out)
+            out.append(0)
+            code = 1
+    out[code_index] = code
+    return bytes(out)
+
+def cobs_decode(data):
+    """Inverse of cobs_encode(); raises ValueError on a malformed block"""
+    out = bytearray()
+    i = 0
+    n = len(data)
+    while i < n:
+        code = data[i]
+        if code == 0 or i + code > n:
+            raise ValueError("Malformed COBS block")
+        out += data[i + 1:i + code]
+        i += code
+        if code < 0xFF and i < n:
+            out.append(0)
+    return bytes(out)
+
+def encode_frame(msg_type, seq, body=b''):
+    """Complete wire frame, including the trailing zero delimiter"""
+    if isinstance(body, str):
+        body = body.encode()
+    if len(body) > MAX_BODY:
+        raise ValueError(f"Frame body too long ({len(body)} > {MAX_BODY} bytes)")
+    payload = bytes((msg_type, seq % SEQ_MODULO)) + body
+    payload += crc16(payload).to_bytes(2, 'big')
+    return cobs_encode(payload) + b'\x00'
+
+class FrameDecoder:
+    """Incremental decoder: feed() raw bytes, get back (type, seq, body) tuples"""
+
+    def __init__(self, max_frame=512):
+        # Runs of bytes longer than this without a delimiter are noise
+        self.max_frame = max_frame
+        self._buffer = bytearray()
+        self.frames = 0
+        self.errors = 0
+
+    def feed(self, data):
+        """Decode every frame completed by data"""
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        start = 0
+        while True:
+            end = buffer.find(b'\x00', start)
+            if end < 0:
+                break
+            raw = bytes(buffer[start:end])
+            start = end + 1
+            if not raw:
+                continue
+            frame = self._decode(raw)
+            if frame is None:
+                self.errors += 1
+            else:
+                self.frames += 1
+                frames.append(frame)
+        del buffer[:start]
+        if len(buffer) > self.max_frame:
+            buffer.clear()
+            self.errors += 1
+        return frames
+
+    @staticmethod
+    def _decode(raw):
+        try:
+            payload = cobs_decode(raw)
+        except ValueError:
+            return None
+        if len(payload) < 4:
+            return None
+        if crc16(payload[:-2]) != int.from_bytes(payload[-2:], 'big'):
+            return None
+        return payload[0], payload[1], payload[2:-2]
+
+class _Outstanding:
+    __slots__ = ('frame', 'body', 'sent_at', 'tries')
+
+    def __init__(self, frame, now, body=None):
+        self.frame = frame
+        self.body = body
+        self.sent_at = now
+        self.tries = 1
+
+class FramedSession:
+    """One end of a framed link, without any I/O
+
+    receive() takes bytes (or receive_frame() decoded frames) and returns
+    the message bodies to deliver plus the frames to answer with; poll()
+    returns the frames due to go out now. The caller owns the transport,
+    the clock and any locking. max_retries=None resends forever.
+    """
+
+    def __init__(self, window=4, retry_timeout=0.25, max_retries=5):
+        if not 1 <= window < SEQ_MODULO // 2:
+            raise ValueError(f"window must be between 1 and {SEQ_MODULO // 2 - 1}")
+        self.window = window
+        self.retry_timeout = retry_timeout
+        self.max_retries = max_retries
+
+        self.decoder = FrameDecoder()
+        self._pending = collections.deque()
+        self._outstanding = collections.OrderedDict()
+        self._next_seq = 0
+        # Next seq to deliver from the peer, and frames that arrived ahead of it
+        self._expected = 0
+        self._early = {}
+        self._reset = None  # RESET waiting for its RESET_ACK
+        self.synced = False
+
+        self.frames_sent = 0
+        self.retransmits = 0
+        self.acked = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.resets = 0
+        self.ack_rtt = None
+
+    @property
+    def in_flight(self):
+        return len(self._outstanding)
+
+    @property
+    def queued(self):
+        return len(self._pending)
+
+    @property
+    def busy(self):
+        """True while anything queued is not yet acknowledged or given up on"""
+        return bool(self._pending or self._outstanding)
+
+    def open(self, now):
+        """Start a new session: number from 0 again once the peer acknowledges RESET
+
+        Frames still unacknowledged from an earlier session are sent again
+        in the new one.
+        """
+        unacked = [entry.body for entry in self._outstanding.values() if entry.body is not None]
+        self._pending.extendleft(reversed(unacked))
+        self._outstanding.clear()
+        self._next_seq = 0
+        self.synced = False
+        self._reset = _Outstanding(encode_frame(MSG_RESET, 0), now)
+        self._reset.tries = 0
+        self._reset.sent_at = now - self.retry_timeout
+
+    def queue(self, body):
+        """Add a message body (bytes or str) to send"""
+        self._pending.append(body.encode() if isinstance(body, str) else body)
+
+    def receive(self, data, now):
+        """Feed raw bytes; returns (bodies to deliver, frames to send back)"""
+        delivered, replies = [], []
+        for msg_type, seq, body in self.decoder.feed(data):
+            self.receive_frame(msg_type, seq, body, now, delivered, replies)
+        return delivered, replies
+
+    def receive_frame(self, msg_type, seq, body, now, delivered, replies):
+        """Handle one decoded frame, appending to delivered and replies"""
+        if msg_type in (MSG_DATA, MSG_SKIP):
+            replies.append(encode_frame(MSG_ACK, seq))
+            # A SKIP fills its seq's place in line with nothing to deliver
+            if msg_type == MSG_SKIP:
+                body = None
+            # Ahead of (or at) the next expected seq, or a retransmission behind it
+            ahead = (seq - self._expected) % SEQ_MODULO
+            if ahead >= SEQ_MODULO // 2 or seq in self._early:
+                self.duplicates += 1
+                return
+            if ahead:
+                self._early[seq] = body
+                self.reordered += 1
+                return
+            if body is not None:
+                delivered.append(body)
+            self._expected = (seq + 1) % SEQ_MODULO
+            self._release(delivered)
+        elif msg_type == MSG_ACK:
+            entry = self._outstanding.pop(seq, None)
+            if entry is None or entry.body is None:
+                return
+            self.acked += 1
+            if entry.tries == 1:
+                rtt = now - entry.sent_at
+                # Smoothed like TCP's SRTT
+                self.ack_rtt = rtt if self.ack_rtt is None else 0.875 * self.ack_rtt + 0.125 * rtt
+        elif msg_type == MSG_RESET:
+            # The peer restarted (or gave up on a SKIP): hand over what was
+            # held behind the gap, then count from 0 again
+            while self._early:
+                self._expected = min(self._early, key=lambda s: (s - self._expected) % SEQ_MODULO)
+                self._release(delivered)
+            self._expected = 0
+            self.resets += 1
+            replies.append(encode_frame(MSG_RESET_ACK, seq))
+        elif msg_type == MSG_RESET_ACK and self._reset is not None:
+            self._reset = None
+            self.synced = True
+
+    def _release(self, delivered):
+        """Deliver held frames that are next in line"""
+        while self._expected in self._early:
+            body = self._early.pop(self._expected)
+            if body is not None:
+                delivered.append(body)
+            self._expected = (self._expected + 1) % SEQ_MODULO
+
+    def poll(self, now):
+        """Frames to write now: RESET, resends and new DATA within the window
+
+        Returns (frames, seqs given up on). A DATA frame given up on is
+        replaced by a SKIP, since the peer holds everything after it until
+        that seq is filled; a SKIP given up on opens a new session.
+        """
+        out, dropped = [], []
+        if self._reset is not None:
+            if now - self._reset.sent_at >= self.retry_timeout:
+                if self._reset.tries:
+                    self.retransmits += 1
+                self._reset.tries += 1
+                self._reset.sent_at = now
+                out.append(self._reset.frame)
+            return out, dropped
+
+        for seq, entry in list(self._outstanding.items()):
+            if now - entry.sent_at < self.retry_timeout:
+                continue
+            if self.max_retries is not None and entry.tries > self.max_retries:
+                if entry.body is None:
+                    # Not even the SKIP got through: start over
+                    self.open(now)
+                    return self.poll(now)[0], dropped
+                self._outstanding[seq] = _Outstanding(encode_frame(MSG_SKIP, seq), now)
+                self.failed += 1
+                dropped.append(seq)
+                out.append(self._outstanding[seq].frame)
+                continue
+            entry.tries += 1
+            entry.sent_at = now
+            self.retransmits += 1
+            out.append(entry.frame)
+        while self._pending and len(self._outstanding) < self.window:
+            seq = self._next_seq
+            self._next_seq = (seq + 1) % SEQ_MODULO
+            body = self._pending.popleft()
+            self._outstanding[seq] = _Outstanding(encode_frame(MSG_DATA, seq, body), now, body)
+            self.frames_sent += 1
+            out.append(self._outstanding[seq].frame)
+        return out, dropped
+
+    def next_deadline(self):
+        """When poll() next has something to resend, or None"""
+        if self._reset is not None:
+            return self._reset.sent_at + self.retry_timeout
+        if not self._outstanding:
+            return None
+        return min(entry.sent_at for entry in self._outstanding.values()) + self.retry_timeout
+
+    def stats(self):
+        """Counters for monitoring"""
+        return {
+            'synced': self.synced,
+            'frames_sent': self.frames_sent,
+            'retransmits': self.retransmits,
+            'acked': self.acked,
+            'failed': self.failed,
+            'duplicates': self.duplicates,
+            'reordered': self.reordered,
+            'resets': self.resets,
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'ack_rtt_ms': None if self.ack_rtt is None else round(self.ack_rtt * 1000, 2),
+        }
+
+class FramedSerialBridge(SerialBridge):
+    """SerialBridge speaking the framed protocol instead of text lines
+
+    Same interface (poll_word, poll_done, send, ...), so SpellingGame works
+    with either. start() opens a new session. send() only queues; a writer
+    thread keeps up to `window` frames in flight, resending each after
+    retry_timeout seconds and giving up after max_retries resends.
+    """
+
+    def __init__(self, ser, window=4, retry_timeout=0.25, max_retries=5):
+        super().__init__(ser)
+        self.session = FramedSession(window, retry_timeout, max_retries)
+        self._cond = threading.Condition()
+        self._writer = None
+
+    def start(self):
+        """Open a session and start the reader and writer threads"""
+        with self._cond:
+            self.session.open(time.monotonic())
+        super().start()
+        self._writer = threading.Thread(target=self._write_loop, name="serial-bridge-writer",
+                                        daemon=True)
+        self._writer.start()
+        return self
+
+    def stop(self):
+        """Stop both threads (the port itself is left open)"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join(timeout=2.0)
+        super().stop()
+
+    def _feed(self, data):
+        """Decode frames, acknowledge DATA and release acknowledged sends"""
+        with self._cond:
+            delivered, replies = self.session.receive(data, time.monotonic())
+            self.lines_dropped = self.session.decoder.errors
+            self._cond.notify_all()
+        if replies:
+            self._write(b''.join(replies))
+        for body in delivered:
+            self.lines_received += 1
+            line = body.decode(errors='ignore').strip()
+            if line:
+                self._dispatch(line)
+
+    def _write(self, frame):
+        with self._write_lock:
+            self.ser.write(frame)
+            self.ser.flush()
+
+    def _write_loop(self):
+        """Send queued frames into the window and resend expired ones"""
+        with self._cond:
+            while not self._stop.is_set():
+                out, dropped = self.session.poll(time.monotonic())
+                for seq in dropped:
+                    print(f"✗ ESP32 never acknowledged message {seq}")
+                if out:
+                    try:
+                        self._write(b''.join(out))
+                    except Exception as e:
+                        self.error = e
+                        print(f"Serial writer error: {e}")
+                        break
+                deadline = self.session.next_deadline()
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                self._cond.wait(timeout)
+            self._cond.notify_all()
+
+    def send(self, *commands):
+        """Queue commands; they are pipelined up to the window size"""
+        with self._cond:
+            for command in commands:
+                self.session.queue(command)
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every queued command is acknowledged or given up on"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.session.busy:
+                if self._stop.is_set():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self):
+        """Counters for monitoring"""
+        stats = super().stats()
+        with self._cond:
+            stats.update(self.session.stats())
+        return stats
+
+class PtyLoopback:
+    """Stand-in ESP32 on a pseudo-terminal that speaks the framed protocol
+
+    The host side is a pyserial port opened on the pty, usable wherever a
+    real board's port is. The device side runs a FramedSession like the
+    host: it opens with RESET, acknowledges every DATA frame, resends its
+    own until acknowledged and answers SERVO with DONE; send_word() pushes
+    a WORD: message to the host. drop_every=N silently discards every Nth
+    incoming frame and corrupt_every=N flips a bit in every Nth outgoing
+    frame, to exercise retransmission. reboot() starts a new session, as
+    a board reset would. POSIX only.
+    """
+
+    def __init__(self, drop_every=0, corrupt_every=0, servo_delay=0.0, retry_timeout=0.1,
+                 max_retries=10):
+        if serial is None:
+            raise RuntimeError("pyserial is required for the loopback")
+        self.drop_every = drop_every
+        self.corrupt_every = corrupt_every
+        self.servo_delay = servo_delay
+        self.received = []
+        self.session = FramedSession(retry_timeout=retry_timeout, max_retries=max_retries)
+
+        self._master, slave = os.openpty()
+        self._slave_name = os.ttyname(slave)
+        self._slave = slave
+        # Wakes the device thread when something is queued from outside it
+        self._wake_read, self._wake_write = os.pipe()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._incoming = 0
+        self._outgoing = 0
+        self.port = None
+
+    def open(self):
+        """Start the device thread and return the host-side serial port"""
+        import tty
+        tty.setraw(self._slave)
+        self.port = serial.Serial(self._slave_name, 115200, timeout=0.1)
+        self.session.open(time.monotonic())
+        self._thread = threading.Thread(target=self._run, name="pty-loopback", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def close(self):
+        self._stop.set()
+        os.write(self._wake_write, b'x')
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        if self.port is not None:
+            self.port.close()
+        for fd in (self._master, self._slave, self._wake_read, self._wake_write):
+            os.close(fd)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def send_word(self, word):
+        """Send WORD:<word> to the host"""
+        self._send_data(f"WORD:{word}")
+
+    def reboot(self):
+        """Forget everything, as a board reset does, and open a new session"""
+        with self._lock:
+            self.session = FramedSession(retry_timeout=self.session.retry_timeout,
+                                         max_retries=self.session.max_retries)
+            self.session.open(time.monotonic())
+        os.write(self._wake_write, b'x')
+
+    def _send_data(self, text):
+        with self._lock:
+            self.session.queue(text)
+        os.write(self._wake_write, b'x')
+
+    def _write(self, frame):
+        self._outgoing += 1
+        if self.corrupt_every and self._outgoing % self.corrupt_every == 0:
+            frame = bytearray(frame)
+            frame[1] ^= 0x01 if frame[1] != 0x01 else 0x02
+            frame = bytes(frame)
+        os.write(self._master, frame)
+
+    def _run(self):
+        import select
+        while not self._stop.is_set():
+            with self._lock:
+                deadline = self.session.next_deadline()
+            timeout = 0.5 if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._master, self._wake_read], [], [], timeout)
+            if self._wake_read in ready:
+                os.read(self._wake_read, 4096)
+            delivered, replies = [], []
+            with self._lock:
+                session = self.session
+                now = time.monotonic()
+                if self._master in ready:
+                    try:
+                        data = os.read(self._master, 4096)
+                    except OSError:
+                        break
+                    for msg_type, seq, body in session.decoder.feed(data):
+                        self._incoming += 1
+                        if self.drop_every and self._incoming % self.drop_every == 0:
+                            continue
+                        session.receive_frame(msg_type, seq, body, now, delivered, replies)
+                frames, _ = session.poll(now)
+            for frame in replies + frames:
+                self._write(frame)
+            for body in delivered:
+                command = body.decode(errors='ignore')
+                self.received.append(command)
+                if command == "SERVO":
+                    if self.servo_delay:
+                        threading.Timer(self.servo_delay, self._send_data, ("DONE",)).start()
+                    else:
+                        self._send_data("DONE")
+
+def main():
+    """Round-trip the loopback with loss and corruption and print the counters"""
+    loopback = PtyLoopback(drop_every=5, corrupt_every=7)
+    port = loopback.open()
+    bridge = FramedSerialBridge(port, window=4, retry_timeout=0.1).start()
+    try:
+        loopback.send_word("cat")
+        print(f"Word received: {bridge.wait_word(timeout=2.0)}")
+        start = time.perf_counter()
+        for _ in range(20):
+            bridge.send("LED_BLINK", "SERVO")
+        ok = bridge.flush(timeout=10.0)
+        elapsed = time.perf_counter() - start
+        print(f"{'✓' if ok else '✗'} 40 commands acknowledged in {elapsed * 1000:.0f} ms, "
+              f"{len(loopback.received)} delivered once each, "
+              f"{'in' if loopback.received == ['LED_BLINK', 'SERVO'] * 20 else 'out of'} order")
+        # Every SERVO is answered with a DONE that the loopback resends until acknowledged
+        deadline = time.monotonic() + 5.0
+        while bridge.lines_received < 21 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        print(f"DONEs received: {bridge.lines_received - 1}/20")
+
+        loopback.reboot()
+        loopback.send_word("dog")
+        print(f"Word after board reset: {bridge.wait_word(timeout=2.0)}")
+        print(bridge.stats())
+    finally:
+        bridge.stop()
+        loopback.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Detection Governor - adapts how often hand detection runs
+Detection runs at full rate while the hand moves, slower once the pose has
+been still for a moment and slower still while no hand is in view. The rate
+is also capped so detection stays within a CPU budget, based on how long
+recent detections took.
+"""
+
+import time
+
+import numpy as np
+
+from landmark_features import landmarks_to_array
+from stage_metrics import metrics
+
+MOVING = 'moving'
+STABLE = 'stable'
+IDLE = 'idle'
+
+class DetectionGovernor:
+    """Decides when the next frame should go through detection
+
+    Call ready() to ask whether a frame is due, then record() with the
+    result and the time process_frame took.
+    """
+
+    def __init__(self, max_fps=30.0, stable_fps=10.0, idle_fps=5.0, cpu_budget=0.5,
+                 motion_tolerance=0.01, stable_after=0.5, alpha=0.2):
+        # Target detection rate for each mode
+        self.rates = {MOVING: max_fps, STABLE: stable_fps, IDLE: idle_fps}
+        # Fraction of one core detection may use (None = no cap)
+        self.cpu_budget = cpu_budget
+        # Largest landmark change (normalised image units) that counts as still
+        self.motion_tolerance = motion_tolerance
+        # How long the pose must stay still before the rate drops
+        self.stable_after = stable_after
+        # Smoothing factor for the latency average
+        self.alpha = alpha
+
+        self.mode = IDLE
+        self.latency = 0.0
+        self.detections = 0
+        self.skipped = 0
+
+        self._last_points = None
+        self._still_since = None
+        self._next_at = 0.0
+
+    @property
+    def current_fps(self):
+        """Detection rate currently aimed for"""
+        fps = self.rates[self.mode]
+        if self.cpu_budget and self.latency > 0:
+            fps = min(fps, self.cpu_budget / self.latency)
+        return fps
+
+    def time_until_next(self, now=None):
+        """Seconds until the next detection is due (0 if due now)"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._next_at - now)
+
+    def ready(self, now=None):
+        """True if a frame should be processed now; counts skipped frames
+
+        A frame arriving within a quarter interval of the due time counts as
+        due, so camera timing jitter does not halve the rate.
+        """
+        if self.time_until_next(now) > 0.25 / self.current_fps:
+            self.skipped += 1
+            return False
+        return True
+
+    def record(self, hand_landmarks, latency, now=None):
+        """Feed back a detection result and how long it took"""
+        now = time.monotonic() if now is None else now
+        self.detections += 1
+        if self.latency:
+            self.latency += self.alpha * (latency - self.latency)
+        else:
+            self.latency = latency
+
+        if hand_landmarks is None:
+            self.mode = IDLE
+            self._last_points = None
+            self._still_since = None
+        else:
+            points = landmarks_to_array(hand_landmarks)
+            moved = (self._last_points is None or
+                     np.abs(points - self._last_points).max() > self.motion_tolerance)
+            self._last_points = points
+            if moved:
+                self._still_since = None
+                self.mode = MOVING
+            else:
+                if self._still_since is None:
+                    self._still_since = now
+                if now - self._still_since >= self.stable_after:
+                    self.mode = STABLE
+
+        self._next_at = now + 1.0 / self.current_fps
+        metrics.set_gauge('detection_target_fps', self.current_fps)
+
+    def stats(self):
+        """Snapshot for monitoring"""
+        return {
+            'mode': self.mode,
+            'fps': round(self.current_fps, 2),
+            'latency_ms': round(self.latency * 1000, 2),
+            'detections': self.detections,
+            'skipped': self.skipped,
+        }
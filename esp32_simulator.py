@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+ESP32 Simulator - software stand-in for bridged_esp_gemini_integration_ver2.ino
+Behaves like the board on a pseudo-terminal or a local TCP socket: it sends
+WORD:<word> after a simulated Gemini fetch, queues commands while the servo
+runs (the sketch does not read serial during its delay() loop), answers
+SERVO with DONE followed by the next word, and accepts LED_BLINK. Link
+latency, jitter and message loss are configurable, and either the text
+line protocol or the framed one from bridge_protocol.py can be spoken.
+"""
+
+import argparse
+import collections
+import heapq
+import os
+import random
+import select
+import socket
+import threading
+import time
+
+from bridge_protocol import FramedSession
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+DEFAULT_WORDS = ['HELLO', 'CAB', 'BED', 'FISH', 'LAMB', 'WIND', 'CALM', 'BIRD', 'MILK', 'YAWN']
+
+class ESP32Simulator:
+    """Simulated board on transport 'pty' (POSIX) or 'socket'
+
+    Timings are in seconds. servo_time is how long SERVO keeps the board
+    busy, word_latency the Gemini round-trip before each WORD:, and
+    link_latency the one-way delay of every message the board sends. Each
+    of them gets up to `jitter` seconds added at random. loss is the
+    probability that any message in either direction is lost.
+    """
+
+    def __init__(self, words=None, transport='pty', protocol='text', servo_time=4.0,
+                 word_latency=1.0, link_latency=0.0, jitter=0.0, loss=0.0,
+                 retry_timeout=0.25, seed=None):
+        if transport not in ('pty', 'socket'):
+            raise ValueError(f"Unknown transport: {transport}")
+        if protocol not in ('text', 'framed'):
+            raise ValueError(f"Unknown protocol: {protocol}")
+        self.words = [word.upper() for word in (words or DEFAULT_WORDS)]
+        self.transport = transport
+        self.protocol = protocol
+        self.servo_time = servo_time
+        self.word_latency = word_latency
+        self.link_latency = link_latency
+        self.jitter = jitter
+        self.loss = loss
+        self.retry_timeout = retry_timeout
+        self._random = random.Random(seed)
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._master = None
+        self._slave = None
+        self._listener = None
+        self._conn = None
+        self.url = None
+
+        self._line_buffer = bytearray()
+        self._session = None
+        if protocol == 'framed':
+            self._session = FramedSession(retry_timeout=retry_timeout, max_retries=10)
+        self._outbox = []  # heap of (due, order, message)
+        self._order = 0
+        # Bytes on their way to the host: (due, data), in sending order
+        self._wire = collections.deque()
+        self._wire_due = 0.0
+        self._inbox = collections.deque()
+        self._busy_until = 0.0
+        self._word_index = 0
+
+        self.words_sent = 0
+        self.servo_runs = 0
+        self.blinks = 0
+        self.other_messages = 0
+        self.lost_in = 0
+        self.lost_out = 0
+        self.max_backlog = 0
+
+    def start(self):
+        """Open the transport and start the board's thread; returns self"""
+        if self.transport == 'pty':
+            import tty
+            self._master, self._slave = os.openpty()
+            tty.setraw(self._slave)
+            self.url = os.ttyname(self._slave)
+        else:
+            self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._listener.bind(('127.0.0.1', 0))
+            self._listener.listen(1)
+            self.url = f"socket://127.0.0.1:{self._listener.getsockname()[1]}"
+        self._stop.clear()
+        if self._session is not None:
+            # Boot: the board's frames are numbered from 0 again
+            self._session.open(time.monotonic())
+        # Like setup(): the first word follows the initial fetch
+        self._schedule_word(time.monotonic())
+        self._thread = threading.Thread(target=self._run, name="esp32-simulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread and close the transport"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        for sock in (self._conn, self._listener):
+            if sock is not None:
+                sock.close()
+        self._master = self._slave = self._conn = self._listener = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def open_port(self, timeout=0.1):
+        """Host-side pyserial port connected to this board"""
+        if serial is None:
+            raise RuntimeError("pyserial is required to open the simulator's port")
+        return serial.serial_for_url(self.url, baudrate=115200, timeout=timeout)
+
+    def _delay(self, base):
+        return base + (self._random.uniform(0.0, self.jitter) if self.jitter else 0.0)
+
+    def _lost(self):
+        return self.loss > 0 and self._random.random() < self.loss
+
+    def _schedule(self, due, message):
+        heapq.heappush(self._outbox, (due, self._order, message))
+        self._order += 1
+
+    def _schedule_word(self, now):
+        word = self.words[self._word_index % len(self.words)]
+        self._word_index += 1
+        self._schedule(now + self._delay(self.word_latency), f"WORD:{word}")
+
+    def _fileno(self):
+        if self.transport == 'pty':
+            return self._master
+        return self._conn.fileno() if self._conn is not None else self._listener.fileno()
+
+    def _read(self):
+        if self.transport == 'pty':
+            return os.read(self._master, 4096)
+        if self._conn is None:
+            self._conn, _ = self._listener.accept()
+            self._conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return b''
+        data = self._conn.recv(4096)
+        if not data:
+            # Host went away; wait for the next connection
+            self._conn.close()
+            self._conn = None
+        return data
+
+    def _write(self, data):
+        if self.transport == 'pty':
+            os.write(self._master, data)
+        elif self._conn is not None:
+            self._conn.sendall(data)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            wake = now + 0.05
+            if self._outbox:
+                wake = min(wake, self._outbox[0][0])
+            if self._wire:
+                wake = min(wake, self._wire[0][0])
+            if self._inbox:
+                wake = min(wake, self._busy_until)
+            if self._session is not None and self._session.next_deadline() is not None:
+                wake = min(wake, self._session.next_deadline())
+            ready, _, _ = select.select([self._fileno()], [], [], max(0.0, wake - now))
+            try:
+                if ready:
+                    self._receive(self._read())
+                self._tick(time.monotonic())
+            except OSError:
+                break
+
+    def _receive(self, data):
+        if not data:
+            return
+        if self._session is not None:
+            now = time.monotonic()
+            delivered, replies = [], []
+            for msg_type, seq, body in self._session.decoder.feed(data):
+                if self._lost():
+                    self.lost_in += 1
+                    continue
+                self._session.receive_frame(msg_type, seq, body, now, delivered, replies)
+            for frame in replies:
+                self._send_raw(frame)
+            for body in delivered:
+                self._accept(body.decode(errors='ignore').strip())
+            return
+        buffer = self._line_buffer
+        buffer += data
+        while True:
+            end = buffer.find(b'\n')
+            if end < 0:
+                break
+            line = bytes(buffer[:end]).decode(errors='ignore').strip()
+            del buffer[:end + 1]
+            if self._lost():
+                self.lost_in += 1
+                continue
+            self._accept(line)
+
+    def _accept(self, command):
+        if not command:
+            return
+        self._inbox.append(command)
+        self.max_backlog = max(self.max_backlog, len(self._inbox))
+
+    def _tick(self, now):
+        """Run queued commands once the servo is idle and send what is due"""
+        while self._inbox and now >= self._busy_until:
+            command = self._inbox.popleft()
+            if command.upper() == "SERVO":
+                self.servo_runs += 1
+                self._busy_until = now + self._delay(self.servo_time)
+                self._schedule(self._busy_until, "DONE")
+                self._schedule_word(self._busy_until)
+            elif command.upper() == "LED_BLINK":
+                self.blinks += 1
+            else:
+                self.other_messages += 1
+        if self.transport == 'socket' and self._conn is None:
+            # Hold messages until the host connects, like bytes in a UART buffer
+            return
+        while self._outbox and self._outbox[0][0] <= now:
+            _, _, message = heapq.heappop(self._outbox)
+            self._send_message(message)
+        if self._session is not None:
+            # RESET until acknowledged, then new DATA and resends
+            frames, _ = self._session.poll(now)
+            for frame in frames:
+                self._send_raw(frame)
+        while self._wire and self._wire[0][0] <= now:
+            self._write(self._wire.popleft()[1])
+
+    def _send_message(self, message):
+        if message.startswith("WORD:"):
+            self.words_sent += 1
+        if self._session is not None:
+            self._session.queue(message)
+        else:
+            self._send_raw(message.encode() + b'\r\n')
+
+    def _send_raw(self, data):
+        """Put bytes on the link: lost, or delivered after link_latency"""
+        if self._lost():
+            self.lost_out += 1
+            return
+        now = time.monotonic()
+        # Like a serial line, later bytes never overtake earlier ones
+        due = max(now + self._delay(self.link_latency), self._wire_due)
+        self._wire_due = due
+        if due <= now and not self._wire:
+            self._write(data)
+        else:
+            self._wire.append((due, data))
+
+    @property
+    def backlog(self):
+        """Commands received but not yet run"""
+        return len(self._inbox)
+
+    def stats(self):
+        """Counters for the load-test report"""
+        return {
+            'words_sent': self.words_sent,
+            'servo_runs': self.servo_runs,
+            'blinks': self.blinks,
+            'other_messages': self.other_messages,
+            'lost_in': self.lost_in,
+            'lost_out': self.lost_out,
+            'retransmits': self._session.retransmits if self._session is not None else 0,
+            'backlog': self.backlog,
+            'max_backlog': self.max_backlog,
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a simulated ESP32 for bridged_asl_recognition-ver2.py')
+    parser.add_argument('--transport', choices=['pty', 'socket'], default='pty')
+    parser.add_argument('--protocol', choices=['text', 'framed'], default='text')
+    parser.add_argument('--words', nargs='+', default=None, help='Words to hand out, in order')
+    parser.add_argument('--servo-time', type=float, default=4.0, help='Seconds SERVO keeps the board busy')
+    parser.add_argument('--word-latency', type=float, default=1.0, help='Seconds to "fetch" each word')
+    parser.add_argument('--link-latency', type=float, default=0.0, help='One-way delay of board messages')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many seconds added to each delay')
+    parser.add_argument('--loss', type=float, default=0.0, help='Probability that a message is lost')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    simulator = ESP32Simulator(args.words, args.transport, args.protocol, args.servo_time,
+                               args.word_latency, args.link_latency, args.jitter, args.loss,
+                               seed=args.seed).start()
+    print(f"✓ Simulated ESP32 listening on {simulator.url} ({args.protocol} protocol)")
+    print("Press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(5.0)
+            print(simulator.stats())
+    except KeyboardInterrupt:
+        print("\nStopped")
+    finally:
+        simulator.stop()
+
+if __name__ == "__main__":
+    main()
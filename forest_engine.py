@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Forest Engine - array-backed RandomForest inference without sklearn
+compile_forest() flattens a fitted RandomForestClassifier into contiguous
+NumPy arrays; CompiledForest evaluates them with plain vectorized NumPy and
+returns the same probabilities as the original predict_proba.
+"""
+
+import numpy as np
+
+ARRAY_NAMES = ['classes', 'roots', 'feature', 'threshold',
+               'children_left', 'children_right', 'leaf_index', 'leaf_values']
+
+class CompiledForest:
+    """Flattened decision forest
+
+    All trees share one node numbering. Leaf nodes point to themselves as
+    both children and own a row in leaf_values (the per-tree class
+    distribution); internal nodes have leaf_index -1.
+    """
+
+    def __init__(self, classes, roots, feature, threshold, children_left,
+                 children_right, leaf_index, leaf_values):
+        self.classes_ = np.asarray(classes)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.children_left = np.asarray(children_left, dtype=np.int32)
+        self.children_right = np.asarray(children_right, dtype=np.int32)
+        self.leaf_index = np.asarray(leaf_index, dtype=np.int32)
+        self.leaf_values = np.asarray(leaf_values, dtype=np.float64)
+        self.n_estimators = len(self.roots)
+
+        # Interleaved (left, right) pairs so one gather picks the next node
+        self._children = np.stack([self.children_left, self.children_right], axis=1).ravel()
+        self._is_leaf = self.leaf_index >= 0
+
+    def apply(self, X):
+        """Leaf node reached in every tree, shape (n_samples, n_estimators)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        # One entry per (sample, tree); only paths still inside the tree
+        # are advanced, so the work shrinks as samples reach their leaves
+        flat_X = np.ascontiguousarray(X).ravel()
+        nodes = np.tile(self.roots, len(X))
+        offsets = np.repeat(np.arange(len(X), dtype=np.intp) * X.shape[1], self.n_estimators)
+        active = np.flatnonzero(~self._is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            # float32 features against float64 thresholds, as sklearn compares;
+            # anything not <= threshold (including NaN) goes right
+            values = flat_X[offsets[active] + self.feature[current]]
+            go_right = ~(values <= self.threshold[current])
+            current = self._children[2 * current + go_right]
+            nodes[active] = current
+            active = active[~self._is_leaf[current]]
+        return nodes.reshape(len(X), self.n_estimators)
+
+    def predict_proba(self, X, chunk_size=256):
+        """Class probabilities averaged over the trees"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        proba = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+        for start in range(0, len(X), chunk_size):
+            leaves = self.leaf_index[self.apply(X[start:start + chunk_size])]
+            # Summing over the tree axis accumulates tree by tree, like sklearn
+            proba[start:start + chunk_size] = self.leaf_values[leaves].sum(axis=1)
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        """Most likely class for every row"""
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def to_arrays(self):
+        """Arrays describing the forest, keyed by ARRAY_NAMES"""
+        return {
+            'classes': self.classes_.astype(str),
+            'roots': self.roots,
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children_left': self.children_left,
+            'children_right': self.children_right,
+            'leaf_index': self.leaf_index,
+            'leaf_values': self.leaf_values,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a forest from to_arrays() output (or an open .npz)"""
+        return cls(**{name: arrays[name] for name in ARRAY_NAMES})
+
+    def save(self, path):
+        """Write the forest as an uncompressed .npz file"""
+        with open(path, 'wb') as f:
+            np.savez(f, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        """Read a forest written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls.from_arrays({name: data[name] for name in data.files})
+
+def compile_forest(model):
+    """Flatten a fitted sklearn RandomForestClassifier into a CompiledForest"""
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError("Only single-output forests can be compiled")
+
+    roots, features, thresholds, lefts, rights, leaf_indices, leaf_values = \
+        [], [], [], [], [], [], []
+    node_offset = 0
+    leaf_offset = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        own = np.arange(n_nodes, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+
+        left = np.where(is_leaf, own, tree.children_left).astype(np.int32)
+        right = np.where(is_leaf, own, tree.children_right).astype(np.int32)
+
+        # Per-tree class distribution at each leaf, normalised like
+        # DecisionTreeClassifier.predict_proba does
+        values = tree.value[is_leaf, 0, :].astype(np.float64)
+        normalizer = values.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        values /= normalizer
+
+        leaf_index = np.full(n_nodes, -1, dtype=np.int32)
+        leaf_index[is_leaf] = leaf_offset + np.arange(int(is_leaf.sum()), dtype=np.int32)
+
+        roots.append(node_offset)
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(left + node_offset)
+        rights.append(right + node_offset)
+        leaf_indices.append(leaf_index)
+        leaf_values.append(values)
+
+        node_offset += n_nodes
+        leaf_offset += len(values)
+
+    # Most leaves are pure, so many share the exact same distribution;
+    # keep each distinct row once and point the leaves at it
+    leaf_values, inverse = np.unique(np.concatenate(leaf_values), axis=0,
+                                     return_inverse=True)
+    leaf_index = np.concatenate(leaf_indices)
+    is_leaf = leaf_index >= 0
+    leaf_index[is_leaf] = inverse.ravel()[leaf_index[is_leaf]]
+
+    return CompiledForest(
+        classes=model.classes_,
+        roots=np.array(roots, dtype=np.int32),
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        children_left=np.concatenate(lefts),
+        children_right=np.concatenate(rights),
+        leaf_index=leaf_index,
+        leaf_values=leaf_values,
+    )
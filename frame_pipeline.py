@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Frame Pipeline - decoupled capture, inference and render for live recognizers
+A capture thread reads the camera as fast as it delivers frames, an inference
+thread classifies the newest frame available, and the caller's render loop
+shows every captured frame with the latest prediction. Stale frames are
+dropped instead of queueing up behind slow inference. An optional
+DetectionGovernor lowers the inference rate when nothing is changing.
+"""
+
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from stage_metrics import metrics
+
+# proba: the model's class probabilities when the classifier exposes them
+# (TrainedASLClassifier.last_proba), for PredictionStabilizer.update(proba=...)
+Prediction = namedtuple(
+    'Prediction', ['letter', 'confidence', 'hand_landmarks', 'frame_id', 'latency', 'proba'],
+    defaults=(None,))
+
+NO_PREDICTION = Prediction("None", 0.0, None, -1, 0.0)
+
+def put_latest(q, item):
+    """Put into a bounded queue, discarding the oldest item when it is full
+
+    Returns True if an item had to be dropped.
+    """
+    dropped = False
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass
+
+class FramePipeline:
+    """Run any classifier with a process_frame(frame) method off the render thread
+
+    process_frame must return (letter, confidence, hand_landmarks), as
+    ASLClassifier, QuickASLClassifier and TrainedASLClassifier all do.
+    """
+
+    def __init__(self, classifier, capture, display_queue_size=2, governor=None):
+        self.classifier = classifier
+        self.capture = capture
+        self.governor = governor
+
+        # Inference only ever sees the newest frame; the display queue keeps
+        # a couple so rendering stays smooth
+        self._infer_queue = queue.Queue(maxsize=1)
+        self._display_queue = queue.Queue(maxsize=display_queue_size)
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._prediction = NO_PREDICTION
+        self._threads = []
+
+        self.capture_failed = False
+        self.frames_captured = 0
+        self.frames_classified = 0
+        self.frames_dropped = 0
+
+    @property
+    def prediction(self):
+        """Latest classification result"""
+        with self._lock:
+            return self._prediction
+
+    def start(self):
+        """Start the capture and inference threads"""
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        """Stop both threads and wait for them to exit"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _capture_loop(self):
+        """Read frames and hand them to inference and display"""
+        frame_id = 0
+        while not self._stop.is_set():
+            ret, frame = self.capture.read()
+            if not ret:
+                self.capture_failed = True
+                break
+
+            captured_at = time.perf_counter()
+            if put_latest(self._infer_queue, (frame_id, captured_at, frame)):
+                self.frames_dropped += 1
+                metrics.count('frames_dropped')
+            # The render loop draws on its frame, so it gets its own copy
+            put_latest(self._display_queue, (frame_id, captured_at, frame.copy()))
+            self.frames_captured += 1
+            metrics.count('frames_captured')
+            frame_id += 1
+
+        # Wake the render loop so it can notice the end of the stream
+        put_latest(self._display_queue, None)
+
+    def _inference_loop(self):
+        """Classify the newest captured frame, one at a time"""
+        while not self._stop.is_set():
+            # Wait until the governor wants the next detection; the queue
+            # keeps only the newest frame in the meantime
+            if self.governor is not None:
+                wait = self.governor.time_until_next()
+                if wait > 0:
+                    self._stop.wait(wait)
+                    continue
+
+            try:
+                frame_id, captured_at, frame = self._infer_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            started = time.perf_counter()
+            try:
+                letter, confidence, hand_landmarks = self.classifier.process_frame(frame)
+                proba = getattr(self.classifier, 'last_proba', None)
+            except Exception as e:
+                print(f"Frame processing failed: {e}")
+                continue
+            elapsed = time.perf_counter() - started
+            metrics.record('process_frame', elapsed)
+            if self.governor is not None:
+                self.governor.record(hand_landmarks, elapsed)
+
+            latency = time.perf_counter() - captured_at
+            with self._lock:
+                self._prediction = Prediction(letter, confidence, hand_landmarks, frame_id,
+                                              latency, proba)
+            self.frames_classified += 1
+            metrics.count('frames_classified')
+            metrics.record('capture_to_prediction', latency)
+
+    def frames(self, timeout=1.0):
+        """Yield (frame, prediction) for every displayed frame
+
+        Ends when the capture stops delivering frames or stop() is called.
+        """
+        while not self._stop.is_set():
+            try:
+                item = self._display_queue.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            if item is None:
+                return
+            _, _, frame = item
+            yield frame, self.prediction
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Inference Scheduler - micro-batch classifier calls from concurrent streams
+Streams submit one landmark row at a time and get a Future back. A single
+scheduler thread gathers the rows waiting from all streams into one
+(N, 63) matrix and classifies it with one classify_batch() call, so the
+per-call feature and predict_proba overhead is paid once per batch instead
+of once per frame. A batch runs as soon as max_batch rows are waiting or
+the oldest row has waited max_wait_ms: larger values mean bigger batches
+and more throughput, smaller ones less added latency.
+"""
+
+import argparse
+import collections
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import numpy as np
+
+from stage_metrics import metrics
+
+class InferenceScheduler:
+    """Batches rows for a classifier with classify_batch(matrix, handedness)
+
+    classifier is normally a TrainedASLClassifier with a model loaded.
+    Results are (letter, confidence) tuples, as classify_landmarks returns.
+    """
+
+    def __init__(self, classifier, max_batch=32, max_wait_ms=2.0):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.classifier = classifier
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._pending = collections.deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.batches = 0
+        self.rows = 0
+        self.full_batches = 0
+
+    @property
+    def running(self):
+        """True while the scheduler thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def mean_batch_size(self):
+        return self.rows / self.batches if self.batches else 0.0
+
+    def start(self):
+        """Start the scheduler thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Finish the rows already submitted, then stop the thread"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def submit(self, features, handedness=None):
+        """Queue one (1, 63) landmark row; returns a Future of (letter, confidence)
+
+        Raises RuntimeError unless the scheduler thread is running, since
+        nothing else would ever resolve the Future.
+        """
+        future = Future()
+        row = np.asarray(features, dtype=np.float32).reshape(-1)
+        with self._cond:
+            if self._stop.is_set() or not self.running:
+                raise RuntimeError("Inference scheduler is not running")
+            self._pending.append((row, handedness, future, time.perf_counter()))
+            # Only a full batch needs to wake the thread early
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        return future
+
+    def classify(self, features, handedness=None, timeout=None):
+        """submit() and wait for the result; TimeoutError after `timeout` seconds"""
+        future = self.submit(features, handedness)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            # Don't spend a batch slot on a row nobody is waiting for
+            future.cancel()
+            raise
+
+    def _next_batch(self):
+        """Wait for a full batch or the oldest row's deadline; None once stopped and drained"""
+        with self._cond:
+            while True:
+                if self._pending:
+                    if len(self._pending) >= self.max_batch:
+                        break
+                    wait = self._pending[0][3] + self.max_wait - time.perf_counter()
+                    if wait <= 0 or self._stop.is_set():
+                        break
+                    self._cond.wait(wait)
+                elif self._stop.is_set():
+                    return None
+                else:
+                    self._cond.wait()
+            count = min(self.max_batch, len(self._pending))
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # Callers may have given up on their rows
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if batch:
+                self._classify(batch)
+
+    def _classify(self, batch):
+        started = time.perf_counter()
+        matrix = np.stack([row for row, _, _, _ in batch])
+        labels = [handedness for _, handedness, _, _ in batch]
+        # '' is neither hand, matching None for a single row
+        handedness = None if not any(labels) else [label or '' for label in labels]
+        try:
+            letters, confidences = self.classifier.classify_batch(matrix, handedness)
+        except Exception as e:
+            for _, _, future, _ in batch:
+                future.set_exception(e)
+            return
+        finished = time.perf_counter()
+
+        for i, (_, _, future, submitted_at) in enumerate(batch):
+            future.set_result((str(letters[i]), float(confidences[i])))
+            metrics.record('batch_wait', started - submitted_at)
+        metrics.record('batch_classify', finished - started)
+        metrics.set_gauge('batch_size', len(batch))
+        self.batches += 1
+        self.rows += len(batch)
+        if len(batch) >= self.max_batch:
+            self.full_batches += 1
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._cond:
+            queued = len(self._pending)
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_size': round(self.mean_batch_size, 2),
+            'full_batches': self.full_batches,
+            'queued': queued,
+            'running': self.running,
+        }
+
+def _drive(streams, rows_per_stream, classify):
+    """Run classify(row) from `streams` threads; returns (seconds, per-call latencies)"""
+    rng = np.random.default_rng(0)
+    data = rng.random((streams, rows_per_stream, 63), dtype=np.float32)
+    latencies = [[] for _ in range(streams)]
+
+    def stream(index):
+        for row in data[index]:
+            started = time.perf_counter()
+            classify(row.reshape(1, -1))
+            latencies[index].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=stream, args=(i,)) for i in range(streams)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, [t for values in latencies for t in values]
+
+def main():
+    from benchmark_pipeline import latency_summary
+    from trained_asl_recognition import DEFAULT_MODEL_PATH, TrainedASLClassifier
+
+    parser = argparse.ArgumentParser(description='Compare per-frame and micro-batched classification')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Model bundle to use')
+    parser.add_argument('--streams', type=int, default=8, help='Concurrent streams')
+    parser.add_argument('--rows', type=int, default=500, help='Landmark rows per stream')
+    parser.add_argument('--max-batch', type=int, nargs='+', default=[4, 8, 16],
+                        help='Batch sizes to try')
+    parser.add_argument('--max-wait-ms', type=float, nargs='+', default=[1.0, 5.0],
+                        help='Maximum waits to try')
+    args = parser.parse_args()
+
+    classifier = TrainedASLClassifier(args.model, gate_tolerance=None)
+    if classifier.model is None:
+        print("✗ A trained model is needed to compare batching")
+        return
+
+    total = args.streams * args.rows
+    elapsed, latencies = _drive(args.streams, args.rows,
+                                lambda row: classifier.classify_batch(row))
+    baseline = total / elapsed
+    p95 = latency_summary(latencies)['p95_ms']
+    print(f"\nper-frame: {baseline:.0f} rows/s, p95 {p95:.2f} ms")
+
+    for max_batch in args.max_batch:
+        for max_wait_ms in args.max_wait_ms:
+            with InferenceScheduler(classifier, max_batch, max_wait_ms) as scheduler:
+                elapsed, latencies = _drive(args.streams, args.rows, scheduler.classify)
+            p95 = latency_summary(latencies)['p95_ms']
+            print(f"batch {max_batch:>3}, wait {max_wait_ms:>4.1f} ms: {total / elapsed:.0f} rows/s "
+                  f"({total / elapsed / baseline:.1f}x), p95 {p95:.2f} ms, "
+                  f"mean batch {scheduler.mean_batch_size:.1f}")
+
+if __name__ == "__main__":
+    main()
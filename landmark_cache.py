@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Landmark Cache - content-addressed store of MediaPipe hand landmarks
+Lets retraining skip hand detection for images that have not changed
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+LANDMARK_SIZE = 63  # 21 landmarks x (x, y, z)
+KEY_SIZE = 16       # bytes of BLAKE2b digest per image
+
+def settings_fingerprint(settings):
+    """Stable byte string describing the detector settings"""
+    return json.dumps(settings, sort_keys=True).encode('utf-8')
+
+def file_key(image_path, fingerprint):
+    """Hash the detector settings together with the image file contents"""
+    digest = hashlib.blake2b(fingerprint, digest_size=KEY_SIZE)
+    with open(image_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+class LandmarkCache:
+    """(landmarks, is_left) samples (or a "no hand" marker) keyed by image content hash
+
+    Everything lives in one .npz file with four columns: the keys, a
+    float32 (N, 63) landmark matrix, a bool "hand found" flag and a bool
+    "left hand" flag.
+    """
+
+    def __init__(self, cache_path, settings):
+        self.cache_path = str(cache_path)
+        self.fingerprint = settings_fingerprint(settings)
+        self.hits = 0
+        self.misses = 0
+
+        self._keys = np.empty(0, dtype=f'S{KEY_SIZE}')
+        self._landmarks = np.empty((0, LANDMARK_SIZE), dtype=np.float32)
+        self._found = np.empty(0, dtype=bool)
+        self._left = np.empty(0, dtype=bool)
+        self._index = {}
+
+        # Entries added since the last save
+        self._new_keys = []
+        self._new_landmarks = []
+        self._new_found = []
+        self._new_left = []
+
+        self.load()
+
+    def __len__(self):
+        return len(self._index)
+
+    def load(self):
+        """Load the cache file if it exists"""
+        if not os.path.exists(self.cache_path):
+            return False
+        try:
+            with np.load(self.cache_path) as data:
+                if 'left' not in data.files:
+                    print(f"Ignoring landmark cache {self.cache_path} written without handedness")
+                    return False
+                self._keys = data['keys']
+                self._landmarks = data['landmarks']
+                self._found = data['found']
+                self._left = data['left']
+        except Exception as e:
+            print(f"Ignoring unreadable landmark cache {self.cache_path}: {e}")
+            return False
+        # NumPy 'S' strings drop trailing NUL bytes, which about 1 in 256
+        # digests end with; pad them back so they match file_key()
+        self._index = {key.ljust(KEY_SIZE, b'\0'): row
+                       for row, key in enumerate(self._keys.tolist())}
+        return True
+
+    def keys_for(self, image_paths, workers=4):
+        """Compute cache keys for many images (hashing is I/O bound)
+
+        An image that cannot be read (vanished, no permission, ...) gets a
+        None key instead of aborting the whole batch.
+        """
+        def key_or_none(path):
+            try:
+                return file_key(path, self.fingerprint)
+            except OSError as e:
+                print(f"Skipping unreadable image {path}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(key_or_none, image_paths))
+
+    def lookup(self, key):
+        """Return (hit, sample); sample is (landmarks, is_left), None for a cached "no hand" """
+        if key is None:
+            return False, None
+        row = self._index.get(key)
+        if row is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        if row < len(self._keys):
+            found = self._found[row]
+            sample = (self._landmarks[row], bool(self._left[row]))
+        else:
+            row -= len(self._keys)
+            found = self._new_found[row]
+            sample = (self._new_landmarks[row], self._new_left[row])
+        return True, (sample if found else None)
+
+    def put(self, key, sample):
+        """Record the extraction result, (landmarks, is_left) or None, for an image"""
+        if key in self._index:
+            return
+        self._index[key] = len(self._keys) + len(self._new_keys)
+        self._new_keys.append(key)
+        if sample is None:
+            self._new_landmarks.append(np.zeros(LANDMARK_SIZE, dtype=np.float32))
+            self._new_found.append(False)
+            self._new_left.append(False)
+        else:
+            landmarks, left = sample
+            self._new_landmarks.append(np.asarray(landmarks, dtype=np.float32))
+            self._new_found.append(True)
+            self._new_left.append(bool(left))
+
+    def save(self):
+        """Write the cache atomically, appending any new entries"""
+        if not self._new_keys and os.path.exists(self.cache_path):
+            return
+
+        if self._new_keys:
+            self._keys = np.concatenate(
+                [self._keys, np.array(self._new_keys, dtype=f'S{KEY_SIZE}')])
+            self._landmarks = np.concatenate(
+                [self._landmarks, np.stack(self._new_landmarks)])
+            self._found = np.concatenate(
+                [self._found, np.array(self._new_found, dtype=bool)])
+            self._left = np.concatenate(
+                [self._left, np.array(self._new_left, dtype=bool)])
+            self._new_keys, self._new_landmarks, self._new_found = [], [], []
+            self._new_left = []
+
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, keys=self._keys, landmarks=self._landmarks, found=self._found,
+                     left=self._left)
+        os.replace(tmp_path, self.cache_path)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Landmark Dataset - memory-mapped storage for extracted hand landmarks
+A dataset is a folder holding a float32 (N, 63) feature matrix, a label
+array, a left-hand flag array, a path index and a small JSON header with
+the row count.
+"""
+
+import json
+import os
+
+import numpy as np
+
+FEATURE_SIZE = 63
+LABEL_DTYPE = '<U8'
+FORMAT_VERSION = 1
+
+FEATURES_FILE = 'features.npy'
+LABELS_FILE = 'labels.npy'
+LEFT_FILE = 'left.npy'
+PATHS_FILE = 'paths.txt'
+META_FILE = 'meta.json'
+
+class LandmarkDatasetWriter:
+    """Fill a preallocated landmark matrix row by row
+
+    With a folder the arrays are .npy memmaps written straight to disk;
+    without one they are plain in-memory arrays of the same shape.
+    """
+
+    def __init__(self, dataset_dir, capacity, feature_size=FEATURE_SIZE):
+        self.dataset_dir = str(dataset_dir) if dataset_dir else None
+        self.capacity = int(capacity)
+        self.feature_size = feature_size
+        self.count = 0
+
+        shape = (max(self.capacity, 1), feature_size)
+        if self.dataset_dir:
+            os.makedirs(self.dataset_dir, exist_ok=True)
+            self.features = np.lib.format.open_memmap(
+                os.path.join(self.dataset_dir, FEATURES_FILE), mode='w+',
+                dtype=np.float32, shape=shape)
+            self.labels = np.lib.format.open_memmap(
+                os.path.join(self.dataset_dir, LABELS_FILE), mode='w+',
+                dtype=LABEL_DTYPE, shape=(shape[0],))
+            self.left = np.lib.format.open_memmap(
+                os.path.join(self.dataset_dir, LEFT_FILE), mode='w+',
+                dtype=bool, shape=(shape[0],))
+            self._paths_file = open(os.path.join(self.dataset_dir, PATHS_FILE),
+                                    'w', encoding='utf-8')
+        else:
+            self.features = np.empty(shape, dtype=np.float32)
+            self.labels = np.empty(shape[0], dtype=LABEL_DTYPE)
+            self.left = np.zeros(shape[0], dtype=bool)
+            self._paths_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def append(self, landmarks, label, path="", left=False):
+        """Store one sample in the next free row"""
+        if self.count >= self.capacity:
+            raise IndexError("Landmark dataset capacity exceeded")
+        self.features[self.count] = landmarks
+        self.labels[self.count] = label
+        self.left[self.count] = left
+        if self._paths_file:
+            self._paths_file.write(f"{path}\n")
+        self.count += 1
+
+    def close(self):
+        """Flush the arrays and record how many rows are valid"""
+        if not self.dataset_dir or self._paths_file is None:
+            return
+        self.features.flush()
+        self.labels.flush()
+        self.left.flush()
+        self._paths_file.close()
+        self._paths_file = None
+        with open(os.path.join(self.dataset_dir, META_FILE), 'w') as f:
+            json.dump({
+                'version': FORMAT_VERSION,
+                'count': self.count,
+                'feature_size': self.feature_size,
+            }, f, indent=2)
+
+    def view(self):
+        """Zero-copy (features, labels) views of the rows written so far"""
+        return self.features[:self.count], self.labels[:self.count]
+
+class LandmarkDataset:
+    """Read-only, memory-mapped view of a dataset folder"""
+
+    def __init__(self, dataset_dir, mmap_mode='r'):
+        self.dataset_dir = str(dataset_dir)
+        with open(os.path.join(self.dataset_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported landmark dataset version: {self.meta.get('version')}")
+
+        count = self.meta['count']
+        self.features = np.load(os.path.join(self.dataset_dir, FEATURES_FILE),
+                                mmap_mode=mmap_mode)[:count]
+        self.labels = np.load(os.path.join(self.dataset_dir, LABELS_FILE),
+                              mmap_mode=mmap_mode)[:count]
+        # Datasets written before handedness was recorded have no flags
+        left_path = os.path.join(self.dataset_dir, LEFT_FILE)
+        self.left = None
+        if os.path.exists(left_path):
+            self.left = np.load(left_path, mmap_mode=mmap_mode)[:count]
+        self._paths = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def paths(self):
+        """Source image path of every row (read on first use)"""
+        if self._paths is None:
+            with open(os.path.join(self.dataset_dir, PATHS_FILE), encoding='utf-8') as f:
+                self._paths = [line.rstrip('\n') for line in f][:len(self)]
+        return self._paths
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Landmark Features - shared feature extraction for training and inference
+Turns MediaPipe hand landmarks, as (N, 21, 3) arrays, into the vectors the
+classifier is trained on. The feature spec is stored in the model bundle so
+the recognizers always rebuild exactly what the model was trained with.
+The finger-state helpers used by the rule classifiers work on the same
+arrays, one hand or a whole dataset at a time.
+"""
+
+from itertools import combinations
+
+import numpy as np
+
+NUM_LANDMARKS = 21
+RAW_FEATURES_VERSION = 0         # image-normalised x, y, z of every landmark
+NORMALIZED_FEATURES_VERSION = 1  # wrist-relative, scale-free + distances/angles
+
+FEATURE_SET_NAMES = {
+    RAW_FEATURES_VERSION: 'raw_landmarks',
+    NORMALIZED_FEATURES_VERSION: 'normalized_landmarks',
+}
+
+WRIST = 0
+MIDDLE_MCP = 9
+FINGERTIPS = [4, 8, 12, 16, 20]
+FINGER_PIPS = [3, 6, 10, 14, 18]
+FINGER_MCPS = [2, 5, 9, 13, 17]
+FINGER_NAMES = ['thumb', 'index', 'middle', 'ring', 'pinky']
+
+# Wrist followed by the four landmarks of each finger, base to tip
+FINGER_CHAINS = [
+    [0, 1, 2, 3, 4],
+    [0, 5, 6, 7, 8],
+    [0, 9, 10, 11, 12],
+    [0, 13, 14, 15, 16],
+    [0, 17, 18, 19, 20],
+]
+
+TIP_PAIRS = list(combinations(range(len(FINGERTIPS)), 2))
+
+# (previous, joint, next) landmark triples for the three bend angles per finger
+_JOINT_TRIPLES = np.array([chain[i:i + 3] for chain in FINGER_CHAINS for i in range(3)])
+_TIP_PAIR_INDEX = np.array([(FINGERTIPS[a], FINGERTIPS[b]) for a, b in TIP_PAIRS])
+_TIPS = np.array(FINGERTIPS)
+_PIPS = np.array(FINGER_PIPS)
+_MCPS = np.array(FINGER_MCPS)
+# Bit weight of each finger in a finger code, thumb highest
+_CODE_WEIGHTS = 1 << np.arange(len(FINGERTIPS) - 1, -1, -1)
+
+def as_landmark_array(landmarks):
+    """View (N, 63) / (63,) coordinate vectors as (N, 21, 3) float32 points"""
+    points = np.asarray(landmarks, dtype=np.float32)
+    return points.reshape(-1, NUM_LANDMARKS, 3)
+
+def landmarks_to_array(landmarks):
+    """(21, 3) float32 array from MediaPipe hand landmarks
+
+    Accepts a NormalizedLandmarkList (results.multi_hand_landmarks[i]),
+    its .landmark sequence, or an array that is already converted. This is
+    the one place landmark objects are read; everything downstream works
+    on the array.
+    """
+    if isinstance(landmarks, np.ndarray):
+        return landmarks.astype(np.float32, copy=False).reshape(NUM_LANDMARKS, 3)
+    landmarks = getattr(landmarks, 'landmark', landmarks)
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32)
+
+def left_hand_mask(handedness, count):
+    """Boolean mask of left hands from 'Left'/'Right' labels or booleans"""
+    if handedness is None:
+        return np.zeros(count, dtype=bool)
+    labels = np.atleast_1d(np.asarray(handedness))
+    if labels.dtype.kind in 'US':
+        mask = np.char.lower(labels.astype(str)) == 'left'
+    else:
+        mask = labels.astype(bool)
+    # A single label applies to every sample
+    return np.broadcast_to(mask, (count,))
+
+def normalize_landmarks(points, handedness=None):
+    """Wrist-relative points scaled so the wrist→middle-MCP bone has length 1
+
+    With handedness, left hands are mirrored in x so every sample looks
+    like a right hand.
+    """
+    points = as_landmark_array(points)
+    relative = points - points[:, WRIST:WRIST + 1, :]
+
+    scale = np.linalg.norm(relative[:, MIDDLE_MCP, :], axis=1)
+    scale[scale == 0] = 1.0
+    relative /= scale[:, None, None]
+
+    if handedness is not None:
+        relative[left_hand_mask(handedness, len(relative)), :, 0] *= -1
+    return relative
+
+def fingertip_distances(normalized):
+    """Distances between every pair of fingertips, (N, 10)"""
+    a = normalized[:, _TIP_PAIR_INDEX[:, 0], :]
+    b = normalized[:, _TIP_PAIR_INDEX[:, 1], :]
+    return np.linalg.norm(a - b, axis=2)
+
+def tip_to_wrist_distances(normalized):
+    """Distance of each fingertip from the wrist, (N, 5)"""
+    return np.linalg.norm(normalized[:, FINGERTIPS, :], axis=2)
+
+def joint_angles(normalized):
+    """Bend angle in radians at the three joints of every finger, (N, 15)
+
+    pi means the joint is straight; smaller values mean it is curled.
+    """
+    prev_pts = normalized[:, _JOINT_TRIPLES[:, 0], :]
+    joints = normalized[:, _JOINT_TRIPLES[:, 1], :]
+    next_pts = normalized[:, _JOINT_TRIPLES[:, 2], :]
+
+    u = prev_pts - joints
+    v = next_pts - joints
+    norms = np.linalg.norm(u, axis=2) * np.linalg.norm(v, axis=2)
+    norms[norms == 0] = 1.0
+    cosine = np.einsum('nij,nij->ni', u, v) / norms
+    return np.arccos(np.clip(cosine, -1.0, 1.0))
+
+def finger_extension(landmarks, method='distance', ratio=0.8):
+    """Extended state of thumb..pinky for (N, 21, 3) points, (N, 5) bool
+
+    'distance': the tip is further from the PIP joint than ratio times the
+    PIP→MCP length (image x/y only). 'vertical': the tip is above the PIP
+    joint in the image.
+    """
+    points = as_landmark_array(landmarks)
+    tips = points[:, _TIPS, :2]
+    pips = points[:, _PIPS, :2]
+    if method == 'vertical':
+        return tips[:, :, 1] < pips[:, :, 1]
+    if method != 'distance':
+        raise ValueError(f"Unknown extension method: {method}")
+    # Compare squared lengths; no square roots needed
+    tip_to_pip = tips - pips
+    pip_to_mcp = pips - points[:, _MCPS, :2]
+    tip_to_pip = (tip_to_pip * tip_to_pip).sum(axis=2)
+    pip_to_mcp = (pip_to_mcp * pip_to_mcp).sum(axis=2)
+    return tip_to_pip > pip_to_mcp * (ratio * ratio)
+
+def finger_codes(extended):
+    """Pack (N, 5) finger states into 5-bit codes, thumb as the highest bit"""
+    return np.asarray(extended).reshape(-1, len(FINGERTIPS)).dot(_CODE_WEIGHTS)
+
+def finger_curl(landmarks):
+    """How far each finger is curled, (N, 5): summed joint bend in radians
+
+    0 for a straight finger, growing as the three joints bend. Bend
+    angles do not depend on position or scale, so raw points work.
+    """
+    angles = joint_angles(as_landmark_array(landmarks))
+    return (np.pi - angles).reshape(len(angles), len(FINGERTIPS), 3).sum(axis=2)
+
+def compute_features(landmarks, version=NORMALIZED_FEATURES_VERSION, handedness=None):
+    """Feature matrix for (N, 21, 3) points or (N, 63) coordinate vectors"""
+    points = as_landmark_array(landmarks)
+    if version == RAW_FEATURES_VERSION:
+        return points.reshape(len(points), -1)
+    if version != NORMALIZED_FEATURES_VERSION:
+        raise ValueError(f"Unknown feature version: {version}")
+
+    normalized = normalize_landmarks(points, handedness)
+    return np.concatenate([
+        normalized.reshape(len(normalized), -1),
+        fingertip_distances(normalized),
+        tip_to_wrist_distances(normalized),
+        joint_angles(normalized),
+    ], axis=1).astype(np.float32)
+
+def feature_names(version=NORMALIZED_FEATURES_VERSION):
+    """Column names matching compute_features()"""
+    if version == RAW_FEATURES_VERSION:
+        return [f'landmark_{i}' for i in range(NUM_LANDMARKS * 3)]
+
+    names = [f'norm_{i}_{axis}' for i in range(NUM_LANDMARKS) for axis in 'xyz']
+    names += [f'tip_dist_{FINGER_NAMES[a]}_{FINGER_NAMES[b]}' for a, b in TIP_PAIRS]
+    names += [f'tip_wrist_dist_{name}' for name in FINGER_NAMES]
+    names += [f'angle_{name}_{joint}' for name in FINGER_NAMES for joint in range(3)]
+    return names
+
+def feature_spec(version=NORMALIZED_FEATURES_VERSION, mirror=False):
+    """Description of a feature set for model metadata"""
+    return {
+        'name': FEATURE_SET_NAMES[version],
+        'version': version,
+        'mirror': bool(mirror and version != RAW_FEATURES_VERSION),
+        'size': len(feature_names(version)),
+    }
+
+def features_from_spec(landmarks, spec, handedness=None):
+    """compute_features() configured by a feature_spec() dict"""
+    version = spec.get('version', RAW_FEATURES_VERSION)
+    return compute_features(landmarks, version,
+                            handedness if spec.get('mirror') else None)
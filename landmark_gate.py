@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Landmark Gate - skip classification while the hand holds still
+Remembers the landmarks of the last classified hand and its prediction. As
+long as a new hand differs from it by less than a tolerance, the cached
+prediction is reused instead of running the model again.
+"""
+
+import numpy as np
+
+from landmark_features import as_landmark_array
+
+class LandmarkDeltaGate:
+    """Prediction cache keyed on landmark movement
+
+    The comparison is against the last *classified* landmarks, not the
+    previous frame, so a slow drift still triggers a new classification
+    once it adds up to more than the tolerance.
+    """
+
+    def __init__(self, tolerance=0.01):
+        # Largest per-coordinate change (normalised image units) that still
+        # counts as the same pose
+        self.tolerance = tolerance
+        self._points = None
+        self._handedness = None
+        self._result = None
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups answered from the cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset(self):
+        """Forget the cached hand; the next lookup is a miss"""
+        self._points = None
+        self._handedness = None
+        self._result = None
+
+    def lookup(self, landmarks, handedness=None):
+        """Cached result if landmarks moved less than the tolerance, else None"""
+        if self._points is not None and handedness == self._handedness:
+            points = as_landmark_array(landmarks)[0]
+            if np.abs(points - self._points).max() <= self.tolerance:
+                self.hits += 1
+                return self._result
+        self.misses += 1
+        return None
+
+    def store(self, landmarks, handedness, result):
+        """Remember the prediction made for these landmarks"""
+        self._points = as_landmark_array(landmarks)[0].copy()
+        self._handedness = handedness
+        self._result = result
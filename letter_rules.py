@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Letter Rules - table-driven rule classification from finger states
+The five extended/closed finger states pack into a 5-bit code, and each
+rule set is compiled once into a 32-entry table mapping every code to a
+(letter, confidence). Classification is a single tuple lookup. Rules that
+can never fire because earlier rules claim all their codes are detected
+when the table is built. Letters that share a code can be told apart by
+geometric refiners attached to the table. Finger states come from
+landmark_features, so whole (N, 21, 3) datasets classify in one pass.
+"""
+
+import sys
+
+import numpy as np
+
+from landmark_features import as_landmark_array, finger_codes, finger_extension
+
+FINGER_ORDER = ('thumb', 'index', 'middle', 'ring', 'pinky')
+NUM_CODES = 1 << len(FINGER_ORDER)
+NO_MATCH = ("None", 0.3)
+
+class RuleShadowError(ValueError):
+    """A rule can never match because earlier rules cover all its codes"""
+
+def pattern_codes(pattern):
+    """All codes matching a pattern such as '01-00'
+
+    One character per finger in FINGER_ORDER: '1' extended, '0' closed,
+    '-' either.
+    """
+    if len(pattern) != len(FINGER_ORDER) or set(pattern) - set('01-'):
+        raise ValueError(f"Bad finger pattern: {pattern!r}")
+    codes = []
+    for code in range(NUM_CODES):
+        bits = format(code, '05b')
+        if all(p == '-' or p == b for p, b in zip(pattern, bits)):
+            codes.append(code)
+    return codes
+
+class RuleTable:
+    """Rules compiled into a lookup table with first-match semantics
+
+    rules is a list of (letter, patterns, confidence); patterns is one
+    pattern string or a list of them. Earlier rules win, exactly as in
+    an if/elif chain. extension is the finger_extension() method used to
+    turn landmarks into finger states. With strict, a shadowed rule raises
+    RuleShadowError unless its letter is listed in allow_shadowed.
+    """
+
+    def __init__(self, rules, default=NO_MATCH, strict=False, extension='distance',
+                 allow_shadowed=()):
+        self.rules = list(rules)
+        self.default = default
+        self.extension = extension
+        self._table = [default] * NUM_CODES
+        self._refiners = {}
+
+        owners = [None] * NUM_CODES
+        self.shadowed = []  # (letter, letters that claim all its codes)
+        for letter, patterns, confidence in self.rules:
+            if isinstance(patterns, str):
+                patterns = [patterns]
+            codes = sorted({code for pattern in patterns for code in pattern_codes(pattern)})
+            free = [code for code in codes if owners[code] is None]
+            if not free:
+                by = sorted({owners[code] for code in codes})
+                self.shadowed.append((letter, by))
+                if strict and letter not in allow_shadowed:
+                    raise RuleShadowError(f"Rule {letter} is shadowed by {', '.join(by)}")
+                continue
+            for code in free:
+                owners[code] = letter
+                self._table[code] = (letter, confidence)
+        self._table = tuple(self._table)
+        self._letters = np.array([letter for letter, _ in self._table])
+        self._confidences = np.array([confidence for _, confidence in self._table],
+                                     dtype=np.float32)
+
+    def lookup(self, code):
+        """(letter, confidence) for a finger code"""
+        return self._table[code]
+
+    def codes(self, landmarks):
+        """Finger codes for (N, 21, 3) points"""
+        return finger_codes(finger_extension(landmarks, self.extension))
+
+    def add_refiner(self, letter, refiner):
+        """Run refiner(points, letter, confidence) whenever the table answers letter
+
+        points is the hand's (21, 3) landmark array.
+
+        The refiner returns a (letter, confidence), typically choosing
+        between letters that share the same finger states.
+        """
+        self._refiners[letter] = refiner
+        return self
+
+    def classify(self, code, points=None):
+        """Table lookup followed by the letter's refiner, if any"""
+        result = self._table[code]
+        refiner = self._refiners.get(result[0])
+        if refiner is not None and points is not None:
+            return refiner(points, *result)
+        return result
+
+    def classify_points(self, points):
+        """(letter, confidence) for one hand's (21, 3) landmark array"""
+        return self.classify(int(self.codes(points)[0]), points)
+
+    def classify_batch(self, landmarks):
+        """Classify (N, 21, 3) points; returns (letters, confidences) arrays"""
+        points = as_landmark_array(landmarks)
+        codes = self.codes(points)
+        letters = self._letters[codes]
+        confidences = self._confidences[codes]
+        # Refiners only run on the rows whose letter needs one
+        for letter, refiner in self._refiners.items():
+            for i in np.flatnonzero(letters == letter):
+                letters[i], confidences[i] = refiner(points[i], letter, confidences[i])
+        return letters, confidences
+
+    def describe(self):
+        """Readable table: one line per code, then the shadowed rules"""
+        lines = []
+        for code, (letter, confidence) in enumerate(self._table):
+            refined = " (refined)" if letter in self._refiners else ""
+            lines.append(f"{format(code, '05b')}  {letter:<4} {confidence:.1f}{refined}")
+        for letter, by in self.shadowed:
+            lines.append(f"shadowed: {letter} (by {', '.join(by)})")
+        return "\n".join(lines)
+
+def split_h_u_v(points, letter, confidence, spread=0.35):
+    """H, U and V share finger states (index and middle up)
+
+    H points sideways; of the upright ones, V has the index and middle
+    tips apart. The tip gap is measured relative to the wrist→middle-MCP
+    length so it does not depend on the distance to the camera.
+    """
+    dx, dy = points[8, :2] - points[5, :2]
+    if abs(dx) > abs(dy):
+        return "H", confidence
+    scale = float(np.linalg.norm(points[9, :2] - points[0, :2])) or 1.0
+    if np.linalg.norm(points[12, :2] - points[8, :2]) / scale > spread:
+        return "V", confidence
+    return "U", confidence
+
+# ASLClassifier, in the order of its original if/elif chain. Letters whose
+# finger states repeat an earlier rule (E, G, J, K, L, O, P, Q, R, S, T, U,
+# V, X, Z) stay listed so the table documents what needs a refiner.
+ASL_RULES = [
+    ("A", "10000", 0.9),
+    ("B", "01111", 0.9),
+    ("C", "00000", 0.7),
+    ("D", "01000", 0.9),
+    ("E", "00000", 0.9),
+    ("F", "11000", 0.8),
+    ("G", "01000", 0.8),
+    ("H", "01100", 0.8),
+    ("I", "00001", 0.9),
+    ("J", "00001", 0.8),
+    ("K", "01100", 0.9),
+    ("L", "11000", 0.9),
+    ("M", ["0001-", "000-1"], 0.8),  # thumb, index, middle closed; ring or pinky up
+    ("N", ["001--", "00-1-", "00--1"], 0.8),  # thumb, index closed; another finger up
+    ("O", "00000", 0.8),
+    ("P", "01000", 0.7),
+    ("Q", "01000", 0.7),
+    ("R", "01100", 0.7),
+    ("S", "00000", 0.9),
+    ("T", "10000", 0.8),
+    ("U", "01100", 0.9),
+    ("V", "01100", 0.9),
+    ("W", "01110", 0.9),
+    ("X", "00000", 0.7),
+    ("Y", "10001", 0.9),
+    ("Z", "01000", 0.6),
+]
+
+# TrainedASLClassifier.classify_letter_fallback
+FALLBACK_RULES = [
+    ("A", "10000", 0.8),
+    ("B", "01111", 0.8),
+    ("C", "00000", 0.7),
+    ("D", "01000", 0.8),
+    ("E", "00000", 0.8),
+    ("U", "01100", 0.8),
+    ("W", "01110", 0.8),
+    ("I", "00001", 0.8),
+    ("Y", "10001", 0.8),
+    ("S", "00000", 0.8),
+]
+
+# QuickASLClassifier
+QUICK_RULES = [
+    ("A", "10000", 0.9),
+    ("B", "01111", 0.9),
+    ("D", "01000", 0.9),
+    ("E", "00000", 0.9),
+    ("U", "01100", 0.9),
+    ("W", "01110", 0.9),
+    ("I", "00001", 0.9),
+    ("Y", "10001", 0.9),
+    ("S", "00000", 0.9),
+]
+
+# Letters the original if/elif chains could never reach: their finger
+# states match an earlier letter's. Any other shadowed rule fails the import.
+ASL_SHADOWED = ("E", "G", "J", "K", "L", "O", "P", "Q", "R", "S", "T", "U", "V", "X", "Z")
+FALLBACK_SHADOWED = ("E", "S")
+QUICK_SHADOWED = ("S",)
+
+# H is the first rule for the index+middle shape; tell H, U and V apart
+ASL_TABLE = RuleTable(ASL_RULES, strict=True,
+                      allow_shadowed=ASL_SHADOWED).add_refiner("H", split_h_u_v)
+FALLBACK_TABLE = RuleTable(FALLBACK_RULES, strict=True, extension='vertical',
+                           allow_shadowed=FALLBACK_SHADOWED)
+QUICK_TABLE = RuleTable(QUICK_RULES, strict=True, extension='vertical',
+                        allow_shadowed=QUICK_SHADOWED)
+
+if __name__ == "__main__":
+    tables = {'asl': ASL_TABLE, 'fallback': FALLBACK_TABLE, 'quick': QUICK_TABLE}
+    names = sys.argv[1:] or list(tables)
+    for name in names:
+        print(f"== {name} ==")
+        print(tables[name].describe())
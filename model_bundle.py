@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Model Bundle - versioned, pickle-free on-disk format for the ASL model
+A bundle is a folder with the compiled forest arrays (forest.npz) and a
+metadata.json describing the classes, features, detector settings and
+the SHA-256 of the array payload.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from forest_engine import CompiledForest
+
+BUNDLE_FORMAT = 'asl-model-bundle'
+BUNDLE_VERSION = 1
+
+PAYLOAD_FILE = 'forest.npz'
+METADATA_FILE = 'metadata.json'
+
+class ModelBundleError(ValueError):
+    """Raised when a bundle is missing, corrupt or of an unknown version"""
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def save_model_bundle(bundle_dir, forest, metadata):
+    """Write a CompiledForest and its metadata as a bundle folder"""
+    bundle_dir = str(bundle_dir)
+    os.makedirs(bundle_dir, exist_ok=True)
+
+    payload_path = os.path.join(bundle_dir, PAYLOAD_FILE)
+    forest.save(payload_path)
+
+    metadata = dict(metadata)
+    metadata.update({
+        'format': BUNDLE_FORMAT,
+        'format_version': BUNDLE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'classes': [str(c) for c in forest.classes_],
+        'payload': PAYLOAD_FILE,
+        'sha256': file_sha256(payload_path),
+    })
+
+    # Metadata goes last so a half-written bundle never looks complete
+    tmp_path = os.path.join(bundle_dir, METADATA_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, os.path.join(bundle_dir, METADATA_FILE))
+    return metadata
+
+def read_bundle_metadata(bundle_dir):
+    """Read and validate a bundle's metadata.json"""
+    metadata_path = os.path.join(str(bundle_dir), METADATA_FILE)
+    if not os.path.exists(metadata_path):
+        raise ModelBundleError(f"No {METADATA_FILE} in {bundle_dir}")
+
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+
+    if metadata.get('format') != BUNDLE_FORMAT:
+        raise ModelBundleError(f"{bundle_dir} is not an ASL model bundle")
+    if metadata.get('format_version') != BUNDLE_VERSION:
+        raise ModelBundleError(
+            f"Unsupported bundle version {metadata.get('format_version')} "
+            f"(expected {BUNDLE_VERSION})")
+    return metadata
+
+def load_model_bundle(bundle_dir, verify=True):
+    """Load a bundle folder and return (forest, metadata)"""
+    metadata = read_bundle_metadata(bundle_dir)
+    payload_path = os.path.join(str(bundle_dir), metadata['payload'])
+
+    if verify and file_sha256(payload_path) != metadata['sha256']:
+        raise ModelBundleError(f"Checksum mismatch for {payload_path}")
+
+    forest = CompiledForest.load(payload_path)
+    if [str(c) for c in forest.classes_] != metadata['classes']:
+        raise ModelBundleError("Bundle classes do not match the forest payload")
+    return forest, metadata
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Prediction Smoother - turns noisy per-frame predictions into stable letters
+Keeps an exponential moving average of class probabilities plus a short
+ring buffer of recent top classes, and only reports a letter once it is
+confident (hysteresis) and has been held long enough. Every update is O(1)
+in the number of frames and reuses preallocated arrays.
+"""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+
+StableEvent = namedtuple('StableEvent', ['letter', 'confidence', 'timestamp', 'previous'])
+
+NO_LETTER = "None"
+
+class PredictionStabilizer:
+    """Streaming debounce for (letter, confidence) or probability vectors
+
+    A new letter is accepted when its smoothed probability reaches
+    enter_threshold, it won at least min_votes of the last `window` frames
+    and it stayed the leading class for min_hold seconds. The accepted
+    letter is kept until its smoothed probability drops below
+    exit_threshold, so small dips do not cause flicker.
+    """
+
+    def __init__(self, classes=None, alpha=0.35, enter_threshold=0.5, exit_threshold=0.3,
+                 min_hold=0.25, window=15, min_votes=0.5, max_classes=32):
+        self.alpha = alpha
+        self.enter_threshold = enter_threshold
+        self.exit_threshold = exit_threshold
+        self.min_hold = min_hold
+        self.min_votes = min_votes
+
+        self._classes = []
+        self._index = {}
+        self._ema = np.zeros(max_classes, dtype=np.float64)
+        self._observation = np.zeros(max_classes, dtype=np.float64)
+        for letter in classes or []:
+            self._class_index(str(letter))
+
+        # Ring buffer of recent top-class indices (-1 = no hand) with counts
+        self._ring = np.full(window, -1, dtype=np.int32)
+        self._votes = np.zeros(max_classes, dtype=np.int32)
+        self._ring_pos = 0
+        self._ring_filled = 0
+
+        self._candidate = -1
+        self._candidate_since = 0.0
+        self.stable_letter = NO_LETTER
+        self.stable_confidence = 0.0
+        self.transitions = 0
+
+    def _class_index(self, letter):
+        """Index of a class, registering it on first sight"""
+        index = self._index.get(letter)
+        if index is None:
+            index = len(self._classes)
+            if index >= len(self._ema):
+                # Rare: more classes than preallocated, grow once
+                grow = len(self._ema)
+                self._ema = np.concatenate([self._ema, np.zeros(grow)])
+                self._observation = np.concatenate([self._observation, np.zeros(grow)])
+                self._votes = np.concatenate([self._votes, np.zeros(grow, dtype=np.int32)])
+            self._classes.append(letter)
+            self._index[letter] = index
+        return index
+
+    def reset(self):
+        """Forget all history"""
+        self._ema[:] = 0.0
+        self._ring[:] = -1
+        self._votes[:] = 0
+        self._ring_pos = 0
+        self._ring_filled = 0
+        self._candidate = -1
+        self.stable_letter = NO_LETTER
+        self.stable_confidence = 0.0
+
+    def _push_vote(self, index):
+        """Add the frame's top class to the ring buffer"""
+        evicted = self._ring[self._ring_pos]
+        if self._ring_filled == len(self._ring) and evicted >= 0:
+            self._votes[evicted] -= 1
+        self._ring[self._ring_pos] = index
+        if index >= 0:
+            self._votes[index] += 1
+        self._ring_pos = (self._ring_pos + 1) % len(self._ring)
+        self._ring_filled = min(self._ring_filled + 1, len(self._ring))
+
+    def update(self, letter, confidence, proba=None, timestamp=None):
+        """Feed one frame's prediction; returns a StableEvent on a transition
+
+        proba, if given, is a probability vector ordered like the classes
+        passed to the constructor and replaces (letter, confidence).
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+
+        # Observation vector for this frame (all zeros when no hand)
+        self._observation[:] = 0.0
+        if proba is not None:
+            self._observation[:len(proba)] = proba
+        elif letter is not None and letter != NO_LETTER:
+            self._observation[self._class_index(str(letter))] = confidence
+        n = len(self._classes)
+
+        self._ema *= 1.0 - self.alpha
+        self._ema += self.alpha * self._observation
+
+        top = int(self._observation[:n].argmax()) if n and self._observation[:n].any() else -1
+        self._push_vote(top)
+
+        leader = int(self._ema[:n].argmax()) if n else -1
+        if leader != self._candidate:
+            self._candidate = leader
+            self._candidate_since = now
+
+        return self._transition(leader, now)
+
+    def _transition(self, leader, now):
+        """Apply hysteresis and hold time; returns an event or None"""
+        current = self._index.get(self.stable_letter, -1)
+        if current >= 0:
+            self.stable_confidence = float(self._ema[current])
+
+        if leader >= 0 and leader != current:
+            score = self._ema[leader]
+            votes = self._votes[leader] / max(self._ring_filled, 1)
+            held = now - self._candidate_since >= self.min_hold
+            if score >= self.enter_threshold and votes >= self.min_votes and held:
+                return self._emit(self._classes[leader], float(score), now)
+
+        if current >= 0 and self._ema[current] < self.exit_threshold:
+            return self._emit(NO_LETTER, 0.0, now)
+        return None
+
+    def _emit(self, letter, confidence, now):
+        """Switch the stable letter and describe the change"""
+        previous = self.stable_letter
+        self.stable_letter = letter
+        self.stable_confidence = confidence
+        self.transitions += 1
+        return StableEvent(letter, confidence, now, previous)
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Recognition Service - one camera and one classifier shared by every viewer
+A background thread captures, classifies, annotates and JPEG-encodes each
+frame once, and publishes the result. Web routes only read the latest
+published frame and prediction, so adding viewers adds no capture or
+inference work. Encoding is capped by quality, width and frame rate, and
+frames that look the same as the last one are not encoded again. With a
+PredictionStabilizer, only the debounced letter is published and drawn.
+The camera is opened by the first subscriber and released again once no
+one has been subscribed for idle_timeout seconds.
+"""
+
+import json
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from frame_pipeline import FramePipeline
+from stage_metrics import metrics
+
+class RecognitionService:
+    """Publishes the latest annotated JPEG and (letter, confidence)
+
+    source is anything cv2.VideoCapture opens (camera index, file, URL) or a
+    callable returning a capture-like object, called on every start().
+    mjpeg_stream() and prediction_events() subscribe while they run; with
+    no subscriber for idle_timeout seconds the capture thread stops and
+    releases the camera (None keeps it running until stop()).
+    """
+
+    def __init__(self, classifier, source=0, annotate=None, confidence_step=0.05,
+                 jpeg_quality=80, max_width=None, target_fps=None, change_threshold=0.5,
+                 stabilizer=None, idle_timeout=10.0):
+        self.classifier = classifier
+        self.source = source
+        self.annotate = annotate
+        # Optional PredictionStabilizer; raw predictions are published without one
+        self.stabilizer = stabilizer
+        # Confidence change that counts as a new prediction event
+        self.confidence_step = confidence_step
+
+        # Stream encoding settings
+        self.jpeg_quality = jpeg_quality
+        self.max_width = max_width
+        self.target_fps = target_fps
+        # Mean absolute difference (0-255) of a 32x24 thumbnail below which
+        # a frame counts as unchanged
+        self.change_threshold = change_threshold
+        self.idle_timeout = idle_timeout
+
+        self.frames_encoded = 0
+        self.frames_unchanged = 0
+        self.frames_rate_limited = 0
+
+        self._condition = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._subscribers = 0
+        self._idle_since = time.monotonic()
+        self._exiting = False
+
+        self._seq = 0
+        self._jpeg = None
+        self._letter = "None"
+        self._confidence = 0.0
+
+        # Prediction events: only bumped when the prediction changes
+        self._event_seq = 0
+        self._event = {'seq': 0, 'letter': "None", 'confidence': 0.0, 'ts': round(time.time(), 3)}
+
+    @property
+    def running(self):
+        """True while the capture thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the capture thread if it is not already running"""
+        with self._start_lock:
+            if self.running:
+                if not self._exiting:
+                    return True
+                # Idle shutdown already under way; let it finish first
+                self._thread.join()
+            self._exiting = False
+            self._idle_since = time.monotonic()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="recognition",
+                                            daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Stop the capture thread and release the camera"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        with self._condition:
+            self._condition.notify_all()
+
+    @property
+    def subscribers(self):
+        with self._start_lock:
+            return self._subscribers
+
+    def subscribe(self):
+        """Register a viewer and make sure the capture thread runs"""
+        with self._start_lock:
+            self._subscribers += 1
+        return self.start()
+
+    def unsubscribe(self):
+        """A viewer left; the idle countdown starts with the last one"""
+        with self._start_lock:
+            self._subscribers = max(0, self._subscribers - 1)
+            if not self._subscribers:
+                self._idle_since = time.monotonic()
+
+    def _idle_expired(self):
+        """True (and committed to exiting) once nobody watched for idle_timeout"""
+        if self.idle_timeout is None:
+            return False
+        with self._start_lock:
+            if self._subscribers or time.monotonic() - self._idle_since < self.idle_timeout:
+                return False
+            self._exiting = True
+            return True
+
+    def latest_prediction(self):
+        """Most recent (letter, confidence)"""
+        with self._condition:
+            return self._letter, self._confidence
+
+    def wait_for_frame(self, last_seq, timeout=1.0):
+        """Block until a frame newer than last_seq is published
+
+        Returns (seq, jpeg_bytes); jpeg_bytes is None on timeout or shutdown.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._seq <= last_seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.running:
+                    return self._seq, None
+                self._condition.wait(remaining)
+            return self._seq, self._jpeg
+
+    def wait_for_prediction(self, last_seq, timeout=1.0):
+        """Block until the prediction changes after event last_seq
+
+        Returns the event dict (seq, letter, confidence, ts), or None on
+        timeout or shutdown.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._event_seq <= last_seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.running:
+                    return None
+                self._condition.wait(remaining)
+            return self._event
+
+    def _publish_frame(self, jpeg):
+        """Make a newly encoded frame visible to all subscribers"""
+        with self._condition:
+            self._seq += 1
+            self._jpeg = jpeg
+            self._condition.notify_all()
+
+    def _publish_prediction(self, letter, confidence):
+        """Record the latest prediction, raising an event if it changed"""
+        with self._condition:
+            self._letter = letter
+            self._confidence = confidence
+
+            if (letter != self._event['letter'] or
+                    abs(confidence - self._event['confidence']) >= self.confidence_step):
+                self._event_seq += 1
+                self._event = {
+                    'seq': self._event_seq,
+                    'letter': letter,
+                    'confidence': round(float(confidence), 3),
+                    'ts': round(time.time(), 3),
+                }
+            self._condition.notify_all()
+
+    def _encode(self, frame):
+        """Scale down to max_width and JPEG-encode with the configured quality"""
+        if self.max_width and frame.shape[1] > self.max_width:
+            height = int(frame.shape[0] * self.max_width / frame.shape[1])
+            with metrics.time('resize'):
+                frame = cv2.resize(frame, (self.max_width, height), interpolation=cv2.INTER_AREA)
+        with metrics.time('imencode'):
+            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)])
+        return buffer.tobytes() if ret else None
+
+    def _run(self):
+        """Capture thread: classify, annotate and encode every frame at most once"""
+        cap = self.source() if callable(self.source) else cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            print("Error: Could not open webcam")
+            return
+
+        min_interval = 1.0 / self.target_fps if self.target_fps else 0.0
+        last_encoded_at = 0.0
+        last_thumbnail = None
+        last_overlay = None
+        last_frame_id = -1
+        if self.stabilizer is not None:
+            self.stabilizer.reset()
+
+        pipeline = FramePipeline(self.classifier, cap).start()
+        try:
+            for frame, prediction in pipeline.frames():
+                if self._stop.is_set() or self._idle_expired():
+                    break
+                if prediction.frame_id != last_frame_id:
+                    last_frame_id = prediction.frame_id
+                    if self.stabilizer is None:
+                        self._publish_prediction(prediction.letter, prediction.confidence)
+                    else:
+                        self.stabilizer.update(prediction.letter, prediction.confidence)
+                        self._publish_prediction(self.stabilizer.stable_letter,
+                                                 self.stabilizer.stable_confidence)
+                if self.stabilizer is not None:
+                    # annotate shows the same letter the API reports
+                    prediction = prediction._replace(letter=self.stabilizer.stable_letter,
+                                                     confidence=self.stabilizer.stable_confidence)
+
+                now = time.monotonic()
+                if now - last_encoded_at < min_interval:
+                    self.frames_rate_limited += 1
+                    continue
+
+                # Skip encoding when neither the camera picture nor what is
+                # drawn over it has changed; new landmarks only matter with a hand
+                overlay = (prediction.letter, round(float(prediction.confidence), 2),
+                           prediction.frame_id if prediction.hand_landmarks is not None else None)
+                thumbnail = cv2.resize(frame, (32, 24), interpolation=cv2.INTER_AREA).astype(np.int16)
+                if (overlay == last_overlay and last_thumbnail is not None and
+                        np.abs(thumbnail - last_thumbnail).mean() < self.change_threshold):
+                    self.frames_unchanged += 1
+                    metrics.count('frames_unchanged')
+                    continue
+
+                if self.annotate:
+                    with metrics.time('annotate'):
+                        frame = self.annotate(frame, prediction)
+
+                jpeg = self._encode(frame)
+                if jpeg is None:
+                    continue
+                last_encoded_at = now
+                last_thumbnail = thumbnail
+                last_overlay = overlay
+                self.frames_encoded += 1
+                metrics.count('frames_encoded')
+                self._publish_frame(jpeg)
+        finally:
+            pipeline.stop()
+            cap.release()
+            with self._condition:
+                self._condition.notify_all()
+
+def mjpeg_stream(service, max_fps=None):
+    """multipart/x-mixed-replace body streaming a service's frames
+
+    Every client shares the service's encoded JPEG. A client whose socket is
+    backed up blocks inside its own write; when it resumes it jumps to the
+    newest frame, so the frames in between are dropped for that client only.
+    max_fps further caps how often this client is sent a frame.
+    """
+    service.subscribe()
+    try:
+        yield from _mjpeg_frames(service, max_fps)
+    finally:
+        service.unsubscribe()
+
+def _mjpeg_frames(service, max_fps):
+    min_interval = 1.0 / max_fps if max_fps else 0.0
+    last_seq = 0  # frame sequence numbers start at 1
+    last_sent_at = 0.0
+    while True:
+        if min_interval:
+            wait = last_sent_at + min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+        seq, jpeg = service.wait_for_frame(last_seq)
+        if jpeg is None:
+            if not service.running:
+                return
+            continue
+        last_seq = seq
+        last_sent_at = time.monotonic()
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n'
+               b'Content-Length: ' + str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n')
+
+def prediction_events(service, max_rate=10.0, keepalive=15.0):
+    """text/event-stream body pushing prediction changes
+
+    Sends at most max_rate events per second; changes in between are
+    coalesced into the newest one. A comment line goes out every keepalive
+    seconds so proxies keep the connection open.
+    """
+    service.subscribe()
+    try:
+        yield from _prediction_events(service, max_rate, keepalive)
+    finally:
+        service.unsubscribe()
+
+def _prediction_events(service, max_rate, keepalive):
+    min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+    last_seq = -1
+    while True:
+        event = service.wait_for_prediction(last_seq, timeout=keepalive)
+        if event is None:
+            if not service.running:
+                return
+            yield ": keep-alive\n\n"
+            continue
+
+        last_seq = event['seq']
+        data = json.dumps(event, separators=(',', ':'))
+        yield f"id: {event['seq']}\nevent: prediction\ndata: {data}\n\n"
+        if min_interval:
+            time.sleep(min_interval)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Serial Bridge - non-blocking line transport for the ESP32 link
+A dedicated I/O thread reads the port in blocking chunks (no busy
+polling), frames newline-terminated messages in a reused bytearray and
+hands them to the render loop through queues and events. The recognition
+loop only ever polls or waits with a timeout, so capture and display keep
+running while the ESP32 is busy.
+"""
+
+import queue
+import threading
+
+try:
+    import serial.tools.list_ports
+except ImportError:
+    serial = None
+
+def find_esp32_port(preferred_port="COM5"):
+    """Device name of the ESP32's USB serial port, or None"""
+    if serial is None:
+        return None
+    ports = list(serial.tools.list_ports.comports())
+    for port in ports:
+        if preferred_port in port.device:
+            return port.device
+        if any(x in port.description for x in ["CP210", "CH340", "USB Serial", "Silicon"]):
+            return port.device
+    if ports:
+        return ports[0].device
+    return None
+
+class SerialBridge:
+    """WORD:/DONE listener and command sender for an open serial port
+
+    ser is a pyserial Serial (or anything with read(), write(), flush()
+    and in_waiting) opened with a read timeout.
+    """
+
+    def __init__(self, ser, max_line=1024):
+        self.ser = ser
+        # Longer lines than this are noise; they are dropped
+        self.max_line = max_line
+
+        self._words = queue.Queue()
+        self._done = threading.Event()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._buffer = bytearray()
+
+        self.bytes_received = 0
+        self.lines_received = 0
+        self.lines_dropped = 0
+        self.error = None
+
+    @property
+    def running(self):
+        """True while the I/O thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the I/O thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._read_loop, name="serial-bridge", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the I/O thread (the port itself is left open)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _read_loop(self):
+        """Read whatever has arrived and split it into lines"""
+        while not self._stop.is_set():
+            try:
+                # Blocks up to the port timeout for the first byte, then
+                # drains everything already buffered in one call
+                data = self.ser.read(1)
+                if not data:
+                    continue
+                waiting = self.ser.in_waiting
+                if waiting:
+                    data += self.ser.read(waiting)
+            except Exception as e:
+                self.error = e
+                print(f"Serial listener error: {e}")
+                break
+            self.bytes_received += len(data)
+            self._feed(data)
+
+    def _feed(self, data):
+        """Append raw bytes and dispatch every complete line"""
+        buffer = self._buffer
+        buffer += data
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                break
+            line = bytes(buffer[start:end]).decode(errors='ignore').strip()
+            start = end + 1
+            if line:
+                self.lines_received += 1
+                self._dispatch(line)
+        # Keep only the unfinished tail; the bytearray itself is reused
+        del buffer[:start]
+        if len(buffer) > self.max_line:
+            buffer.clear()
+            self.lines_dropped += 1
+
+    def _dispatch(self, line):
+        """Route one message from the ESP32"""
+        if line.startswith("WORD:"):
+            word = line[5:].strip().upper()
+            if word:
+                self._words.put(word)
+        elif line == "DONE":
+            self._done.set()
+
+    def poll_word(self):
+        """Next word sent by the ESP32, or None if there is none yet"""
+        try:
+            return self._words.get_nowait()
+        except queue.Empty:
+            return None
+
+    def wait_word(self, timeout=None):
+        """Wait up to timeout seconds for a word; None on timeout"""
+        try:
+            return self._words.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def clear_done(self):
+        """Forget an earlier DONE before sending a new command"""
+        self._done.clear()
+
+    def poll_done(self):
+        """True (once) if DONE has arrived since clear_done()"""
+        if self._done.is_set():
+            self._done.clear()
+            return True
+        return False
+
+    def wait_done(self, timeout=None):
+        """Wait up to timeout seconds for DONE; returns whether it came"""
+        if self._done.wait(timeout):
+            self._done.clear()
+            return True
+        return False
+
+    def send(self, *commands):
+        """Write one or more newline-terminated commands"""
+        payload = b''.join(command.encode() + b'\n' for command in commands)
+        with self._write_lock:
+            self.ser.write(payload)
+            self.ser.flush()
+
+    def stats(self):
+        """Counters for monitoring"""
+        return {
+            'bytes_received': self.bytes_received,
+            'lines_received': self.lines_received,
+            'lines_dropped': self.lines_dropped,
+            'words_queued': self._words.qsize(),
+            'running': self.running,
+        }
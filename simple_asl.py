@@ -4,11 +4,16 @@ Simple ASL Letter Recognition - Command Line Version
 This version runs without the web interface for testing
 """
 
+import argparse
+import time
 import cv2
 import numpy as np
 from asl_classifier import ASLClassifier
+from prediction_smoother import PredictionStabilizer
+from detection_governor import DetectionGovernor
+from stage_metrics import metrics, PeriodicReporter
 
-def main():
+def main(metrics_interval=0):
     print("ASL Letter Recognition - Simple Version")
     print("Press 'q' to quit, 's' to save image")
     print("=" * 40)
@@ -25,8 +30,13 @@ def main():
     
     print("Webcam opened successfully")
     print("Make ASL signs in front of the camera...")
+    # Optional periodic latency/FPS summary on the console
+    reporter = PeriodicReporter(metrics, metrics_interval)
     
-    frame_count = 0
+    stabilizer = PredictionStabilizer()
+    # Detect less often while no hand is visible or the pose is held
+    governor = DetectionGovernor()
+    letter, confidence, hand_landmarks = "None", 0.0, None
     
     try:
         while True:
@@ -34,29 +44,44 @@ def main():
             if not ret:
                 print("Error: Could not read frame")
                 break
+            metrics.count('frames_captured')
             
-            # Process frame
-            letter, confidence, hand_landmarks = classifier.process_frame(frame)
+            # Process frame when the governor says detection is due
+            event = None
+            if governor.ready():
+                started = time.perf_counter()
+                letter, confidence, hand_landmarks = classifier.process_frame(frame)
+                elapsed = time.perf_counter() - started
+                metrics.record('process_frame', elapsed)
+                metrics.count('frames_classified')
+                governor.record(hand_landmarks, elapsed)
+                event = stabilizer.update(letter, confidence)
             
             # Draw landmarks if hand detected
             if hand_landmarks:
-                frame = classifier.draw_landmarks(frame, hand_landmarks)
+                with metrics.time('draw_landmarks'):
+                    frame = classifier.draw_landmarks(frame, hand_landmarks)
             
             # Add text overlay
-            cv2.putText(frame, f"Letter: {letter}", (10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.putText(frame, f"Confidence: {confidence:.2f}", (10, 70),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.putText(frame, "Press 'q' to quit", (10, 110),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            with metrics.time('put_text'):
+                cv2.putText(frame, f"Letter: {letter}", (10, 30),
+                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                cv2.putText(frame, f"Confidence: {confidence:.2f}", (10, 70),
+                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                cv2.putText(frame, "Press 'q' to quit", (10, 110),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+                cv2.putText(frame, f"Detection: {governor.current_fps:.0f} fps ({governor.mode})", (10, 140),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
             
             # Show frame
-            cv2.imshow('ASL Recognition', frame)
+            with metrics.time('imshow'):
+                cv2.imshow('ASL Recognition', frame)
+            metrics.count('frames_displayed')
+            reporter.poll()
             
-            # Print to console every 30 frames (about 1 second)
-            frame_count += 1
-            if frame_count % 30 == 0 and letter != "None":
-                print(f"Detected: {letter} (confidence: {confidence:.2f})")
+            # Print to console when the stable letter changes
+            if event and event.letter != "None":
+                print(f"Detected: {event.letter} (confidence: {event.confidence:.2f})")
             
             # Handle key presses
             key = cv2.waitKey(1) & 0xFF
@@ -77,4 +102,8 @@ def main():
         print("Camera released")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--metrics", type=float, default=0, metavar="SECONDS",
+                        help="Print a latency/FPS summary every SECONDS (0 = off)")
+    args = parser.parse_args()
+    main(metrics_interval=args.metrics) 
\ No newline at end of file
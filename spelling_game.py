@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Spelling Game - the ESP32 word/servo cycle as a frame-driven state machine
+The ESP32 sends a word, the user fingerspells it, the servo runs and the
+ESP32 answers DONE. Each step is advanced from the render loop by
+update(), which only polls the bridge, so frames never wait on the serial
+link.
+"""
+
+import time
+
+WAITING_FOR_WORD = 'waiting_for_word'
+SPELLING = 'spelling'
+WAITING_FOR_DONE = 'waiting_for_done'
+
+class SpellingGame:
+    """Tracks the word being spelled and talks to the ESP32 through a bridge
+
+    bridge is a SerialBridge or FramedSerialBridge (or None to run without
+    hardware, in which case the game simply waits for a word).
+    """
+
+    def __init__(self, bridge, done_timeout=15.0, verbose=True):
+        self.bridge = bridge
+        # Give up on DONE after this many seconds and ask for the next word
+        self.done_timeout = done_timeout
+        # Load tests run many words; they turn the console messages off
+        self.verbose = verbose
+
+        self.state = WAITING_FOR_WORD
+        self.current_word = None
+        self.letter_index = 0
+        self.words_completed = 0
+        self.done_timeouts = 0
+        self._waiting_since = time.monotonic()
+        self._announced = False
+
+    @property
+    def next_letter(self):
+        """Letter to sign next, or None"""
+        if self.state != SPELLING or self.letter_index >= len(self.current_word):
+            return None
+        return self.current_word[self.letter_index]
+
+    def status(self):
+        """Short description for the on-screen overlay"""
+        if self.state == WAITING_FOR_WORD:
+            return "Waiting for word..."
+        if self.state == WAITING_FOR_DONE:
+            return "Servo running..."
+        return f"Next: {self.next_letter}"
+
+    def update(self, event=None):
+        """Advance the game; event is the stabilizer's StableEvent (or None)
+
+        Returns True when the letter in event was accepted. The stabilizer
+        only raises an event when its letter changes, so a held letter
+        counts once: a double letter has to be released (or another letter
+        shown) and signed again.
+        """
+        now = time.monotonic()
+
+        if self.state == WAITING_FOR_WORD:
+            if not self._announced:
+                self._log("Waiting for word from ESP32...")
+                self._announced = True
+            word = self.bridge.poll_word() if self.bridge else None
+            if word:
+                self.current_word = word
+                self.letter_index = 0
+                self.state = SPELLING
+                self._log(f"Spell this word: {word}")
+            return False
+
+        if self.state == WAITING_FOR_DONE:
+            if self.bridge is None or self.bridge.poll_done():
+                self._log("Servo done. Waiting for next word...")
+                self._next_word()
+            elif now - self._waiting_since > self.done_timeout:
+                self._log("✗ No DONE from ESP32; waiting for next word")
+                self.done_timeouts += 1
+                self._next_word()
+            return False
+
+        # Spelling: accept the expected letter once it is stable
+        if event is None or event.letter != self.next_letter:
+            return False
+        self._log(f"Correct: {event.letter}")
+        self.letter_index += 1
+        if self.letter_index >= len(self.current_word):
+            self._log("Word completed! Triggering servo...")
+            self.words_completed += 1
+            self.state = WAITING_FOR_DONE
+            self._waiting_since = now
+            if self.bridge:
+                self.bridge.clear_done()
+                self.bridge.send("SERVO", "LED_BLINK")
+        return True
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def _next_word(self):
+        self.state = WAITING_FOR_WORD
+        self.current_word = None
+        self.letter_index = 0
+        self._announced = False
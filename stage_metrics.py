@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Stage Metrics - lightweight latency and throughput instrumentation
+Each pipeline stage (colour conversion, hand detection, prediction,
+drawing, encoding, ...) records its duration into a fixed-size ring buffer,
+from which rolling p50/p95/p99 are computed on demand. Counters track
+frames captured, classified and dropped along with their recent rate.
+Everything can be rendered as Prometheus text or a console summary.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+class LatencyWindow:
+    """Ring buffer of the most recent durations for one stage"""
+
+    def __init__(self, size=512):
+        self._samples = np.zeros(size, dtype=np.float64)
+        self._pos = 0
+        self._filled = 0
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        self._samples[self._pos] = seconds
+        self._pos = (self._pos + 1) % len(self._samples)
+        self._filled = min(self._filled + 1, len(self._samples))
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self, quantiles=QUANTILES):
+        """Rolling quantiles in seconds (zeros before the first sample)"""
+        if not self._filled:
+            return [0.0] * len(quantiles)
+        return np.quantile(self._samples[:self._filled], quantiles).tolist()
+
+class RateCounter:
+    """Monotonic counter with its rate over the last few events"""
+
+    def __init__(self, size=64):
+        self._stamps = np.zeros(size, dtype=np.float64)
+        self._pos = 0
+        self._filled = 0
+        self.total = 0
+
+    def add(self, n=1, now=None):
+        self._stamps[self._pos] = time.monotonic() if now is None else now
+        self._pos = (self._pos + 1) % len(self._stamps)
+        self._filled = min(self._filled + 1, len(self._stamps))
+        self.total += n
+
+    def rate(self, now=None):
+        """Events per second over the buffered window; 0 once it goes quiet"""
+        if self._filled < 2:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        newest = self._stamps[(self._pos - 1) % len(self._stamps)]
+        full = self._filled == len(self._stamps)
+        oldest = self._stamps[self._pos] if full else self._stamps[0]
+        span = newest - oldest
+        # Nothing recent: report idle rather than the last busy rate
+        if span <= 0 or now - newest > max(span, 1.0):
+            return 0.0
+        return (self._filled - 1) / span
+
+class _StageTimer:
+    """Context manager recording one stage's duration"""
+
+    __slots__ = ('_registry', '_stage', '_start')
+
+    def __init__(self, registry, stage):
+        self._registry = registry
+        self._stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._registry.record(self._stage, time.perf_counter() - self._start)
+        return False
+
+class MetricsRegistry:
+    """Thread-safe collection of stage latencies, counters and gauges"""
+
+    def __init__(self, window=512, enabled=True):
+        self.window = window
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def time(self, stage):
+        """`with metrics.time('hands_process'):` records the block's duration"""
+        return _StageTimer(self, stage)
+
+    def record(self, stage, seconds):
+        """Add one duration sample for a stage"""
+        if not self.enabled:
+            return
+        with self._lock:
+            window = self._stages.get(stage)
+            if window is None:
+                window = self._stages[stage] = LatencyWindow(self.window)
+            window.record(seconds)
+
+    def count(self, name, n=1):
+        """Increment a counter (frames_captured, frames_dropped, ...)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            counter = self._counters.get(name)
+            if counter is None:
+                counter = self._counters[name] = RateCounter()
+            counter.add(n)
+
+    def set_gauge(self, name, value):
+        """Record a current value such as the detection rate"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = float(value)
+
+    def reset(self):
+        """Drop everything recorded so far"""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def drain(self):
+        """(stage seconds, counter totals) recorded since the last drain, then reset
+
+        Lets a worker process hand one frame's timings to the parent's registry.
+        """
+        with self._lock:
+            stages = {stage: window.total for stage, window in self._stages.items()}
+            counters = {name: counter.total for name, counter in self._counters.items()}
+            self._stages.clear()
+            self._counters.clear()
+            self._gauges.clear()
+        return stages, counters
+
+    def snapshot(self):
+        """Plain dict of the current values, latencies in milliseconds"""
+        with self._lock:
+            stages = {}
+            for stage, window in self._stages.items():
+                p50, p95, p99 = window.quantiles()
+                stages[stage] = {
+                    'count': window.count,
+                    'p50_ms': round(p50 * 1000, 3),
+                    'p95_ms': round(p95 * 1000, 3),
+                    'p99_ms': round(p99 * 1000, 3),
+                    'mean_ms': round(window.total / window.count * 1000, 3),
+                }
+            counters = {name: {'total': counter.total, 'rate': round(counter.rate(), 2)}
+                        for name, counter in self._counters.items()}
+            return {'stages': stages, 'counters': counters, 'gauges': dict(self._gauges)}
+
+    def prometheus_text(self, prefix='asl'):
+        """Render the metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                f"# HELP {prefix}_stage_latency_seconds Rolling latency of each pipeline stage",
+                f"# TYPE {prefix}_stage_latency_seconds summary",
+            ]
+            for stage, window in sorted(self._stages.items()):
+                for q, value in zip(QUANTILES, window.quantiles()):
+                    lines.append(f'{prefix}_stage_latency_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+                lines.append(f'{prefix}_stage_latency_seconds_sum{{stage="{stage}"}} {window.total:.6f}')
+                lines.append(f'{prefix}_stage_latency_seconds_count{{stage="{stage}"}} {window.count}')
+
+            lines += [
+                f"# HELP {prefix}_events_total Frames and other events counted by the pipeline",
+                f"# TYPE {prefix}_events_total counter",
+            ]
+            for name, counter in sorted(self._counters.items()):
+                lines.append(f'{prefix}_events_total{{event="{name}"}} {counter.total}')
+
+            lines += [
+                f"# HELP {prefix}_events_per_second Recent rate of each counted event",
+                f"# TYPE {prefix}_events_per_second gauge",
+            ]
+            for name, counter in sorted(self._counters.items()):
+                lines.append(f'{prefix}_events_per_second{{event="{name}"}} {counter.rate():.3f}')
+
+            for name, value in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                lines.append(f"{prefix}_{name} {value:g}")
+            return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Short multi-line report for the console"""
+        snapshot = self.snapshot()
+        lines = ["--- metrics ---"]
+        for name, counter in sorted(snapshot['counters'].items()):
+            lines.append(f"{name}: {counter['total']} ({counter['rate']:.1f}/s)")
+        for stage, stats in sorted(snapshot['stages'].items(),
+                                   key=lambda item: -item[1]['p50_ms']):
+            lines.append(f"{stage}: p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms, "
+                         f"p99 {stats['p99_ms']:.2f} ms")
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines.append(f"{name}: {value:g}")
+        return "\n".join(lines)
+
+class PeriodicReporter:
+    """Prints a registry's summary every `interval` seconds when polled"""
+
+    def __init__(self, registry, interval):
+        self.registry = registry
+        self.interval = interval
+        self._next_at = time.monotonic() + interval if interval else None
+
+    def poll(self):
+        """Call from a frame loop; prints when the interval has passed"""
+        if self._next_at is None:
+            return
+        now = time.monotonic()
+        if now >= self._next_at:
+            print(self.registry.summary())
+            self._next_at = now + self.interval
+
+# Shared registry used by the classifiers, pipelines and web app
+metrics = MetricsRegistry()
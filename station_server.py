@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Station Server - recognition for several signing stations in one server
+Every station (camera index, video file or stream URL) gets its own
+RecognitionService, so its own capture thread, FramePipeline, stabilizer
+and JPEG stream, just as app.py runs a single camera. Hand detection and
+classification run in a pool of worker processes sized to the CPU cores.
+Each station is pinned to one worker, which keeps that station's MediaPipe
+tracking state and landmark gate from frame to frame. Streams are served
+per station under /stations/<id>/; /metrics includes the workers' stages,
+both overall and as station<id>_<stage>. A worker that dies is restarted.
+
+With --in-process the stations run on threads in the server process
+instead, each with its own recognizer, and the trained model's rows from
+all stations are micro-batched by one shared InferenceScheduler.
+"""
+
+import argparse
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+from flask import Flask, Response, abort, jsonify, request
+
+from benchmark_pipeline import CLASSIFIER_NAMES, build_classifier
+from inference_scheduler import InferenceScheduler
+from landmark_features import landmarks_to_array
+from prediction_smoother import PredictionStabilizer
+from recognition_service import RecognitionService, mjpeg_stream, prediction_events
+from stage_metrics import metrics
+
+# MediaPipe's 21-point hand skeleton
+HAND_CONNECTIONS = [
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+]
+
+# Per-worker state, created once by _init_worker
+_worker = {}
+
+def _init_worker(classifier_name, model_path):
+    """Remember which recognizer to build for each station"""
+    # One process per core already; keep OpenCV from spawning its own threads
+    cv2.setNumThreads(1)
+    _worker['classifier_name'] = classifier_name
+    _worker['model_path'] = model_path
+    _worker['classifiers'] = {}
+    metrics.reset()
+
+def _ready():
+    return os.getpid()
+
+def _classify(station_id, frame):
+    """(letter, confidence, (21, 3) landmark array or None, timings) for a station's frame
+
+    timings is metrics.drain() of the worker: this frame's stage durations
+    and counters, which the parent records in its own registry.
+    """
+    classifiers = _worker['classifiers']
+    classifier = classifiers.get(station_id)
+    if classifier is None:
+        # Tracking state belongs to one stream, so each station has its own
+        classifier = build_classifier(_worker['classifier_name'], _worker['model_path'])
+        classifiers[station_id] = classifier
+    letter, confidence, hand_landmarks = classifier.process_frame(frame)
+    # Landmark protobufs stay in the worker; the array is cheap to send back
+    points = landmarks_to_array(hand_landmarks) if hand_landmarks else None
+    return letter, float(confidence), points, metrics.drain()
+
+class WorkerPool:
+    """One single-process executor per worker, so stations can be pinned"""
+
+    def __init__(self, workers, classifier_name='trained', model_path=None):
+        self.classifier_name = classifier_name
+        self.model_path = model_path
+        self._lock = threading.Lock()
+        self.restarts = 0
+        self.executors = [self._new_executor() for _ in range(max(1, workers))]
+
+    def _new_executor(self):
+        # spawn: MediaPipe state must not be inherited through fork
+        context = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker,
+                                   initargs=(self.classifier_name, self.model_path))
+
+    def __len__(self):
+        return len(self.executors)
+
+    def warm_up(self):
+        """Start every worker process now rather than on its first frame"""
+        for future in [executor.submit(_ready) for executor in self.executors]:
+            future.result()
+
+    def submit(self, worker, station_id, frame):
+        executor = self.executors[worker]
+        try:
+            return executor.submit(_classify, station_id, frame)
+        except BrokenProcessPool:
+            # The worker died; its stations start over on a fresh process
+            return self.restart(worker, executor).submit(_classify, station_id, frame)
+
+    def restart(self, worker, broken):
+        """Replace a broken executor (once, however many stations notice)"""
+        with self._lock:
+            if self.executors[worker] is broken:
+                print(f"✗ Recognition worker {worker} died, restarting it")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.executors[worker] = self._new_executor()
+                self.restarts += 1
+                metrics.count('worker_restarts')
+            return self.executors[worker]
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+class RemoteClassifier:
+    """process_frame() proxy running a station's frames on its pinned worker
+
+    Frames wider than max_width are scaled down before they are sent;
+    the landmarks are normalized, so they still fit the full-size frame.
+    """
+
+    def __init__(self, pool, station_id, worker, max_width=640, timeout=10.0):
+        self.pool = pool
+        self.station_id = station_id
+        self.worker = worker
+        self.max_width = max_width
+        self.timeout = timeout
+
+    def process_frame(self, frame):
+        if self.max_width and frame.shape[1] > self.max_width:
+            height = int(frame.shape[0] * self.max_width / frame.shape[1])
+            with metrics.time('resize'):
+                frame = cv2.resize(frame, (self.max_width, height), interpolation=cv2.INTER_AREA)
+        future = self.pool.submit(self.worker, self.station_id, frame)
+        letter, confidence, points, (stages, counters) = future.result(timeout=self.timeout)
+        # Worker stages (hands_process, predict_proba, gate_hits, ...), overall and per station
+        tag = f"station{self.station_id}_"
+        for stage, seconds in stages.items():
+            metrics.record(stage, seconds)
+            metrics.record(tag + stage, seconds)
+        for name, n in counters.items():
+            metrics.count(name, n)
+            metrics.count(tag + name, n)
+        return letter, confidence, points
+
+class ReplayCapture:
+    """Local stand-in for a live camera or stream URL
+
+    Replays a video file forever, paced at the file's own frame rate, so
+    a recording behaves like a camera that never ends.
+    """
+
+    def __init__(self, path, fps=None):
+        self.path = path
+        self._cap = cv2.VideoCapture(path)
+        self.fps = fps or self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._next_at = time.monotonic()
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def read(self):
+        ret, frame = self._cap.read()
+        if not ret:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read()
+        wait = self._next_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._next_at = max(self._next_at, time.monotonic() - 1.0) + 1.0 / self.fps
+        return ret, frame
+
+    def release(self):
+        self._cap.release()
+
+def parse_source(text):
+    """Camera index for digit strings, otherwise a file path or URL"""
+    return int(text) if text.isdigit() else text
+
+def annotate_points(frame, prediction):
+    """Draw the hand skeleton from a (21, 3) landmark array and the prediction"""
+    points = prediction.hand_landmarks
+    if points is not None:
+        with metrics.time('draw_landmarks'):
+            height, width = frame.shape[:2]
+            pixels = [(int(x * width), int(y * height)) for x, y, _ in points]
+            for start, end in HAND_CONNECTIONS:
+                cv2.line(frame, pixels[start], pixels[end], (255, 255, 255), 2)
+            for pixel in pixels:
+                cv2.circle(frame, pixel, 4, (0, 0, 255), -1)
+    with metrics.time('put_text'):
+        cv2.putText(frame, f"Letter: {prediction.letter}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.putText(frame, f"Confidence: {prediction.confidence:.2f}", (10, 70),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    return frame
+
+class StationServer:
+    """RecognitionServices for N sources sharing one worker pool"""
+
+    def __init__(self, sources, workers=0, classifier_name='trained', model_path=None,
+                 replay=False, detect_width=640, jpeg_quality=80, stream_width=960,
+                 target_fps=30, idle_timeout=None, in_process=False):
+        self.pool = None
+        self.scheduler = None
+        if not in_process:
+            workers = workers or os.cpu_count() or 1
+            self.pool = WorkerPool(min(workers, len(sources)), classifier_name, model_path)
+        self.stations = {}
+        for index, source in enumerate(sources):
+            station_id = str(index)
+            capture = source
+            if replay and isinstance(source, str) and os.path.isfile(source):
+                capture = functools.partial(ReplayCapture, source)
+            if self.pool is not None:
+                worker = index % len(self.pool)
+                classifier = RemoteClassifier(self.pool, station_id, worker, detect_width)
+            else:
+                worker = None
+                classifier = self._local_classifier(classifier_name, model_path)
+            service = RecognitionService(classifier, source=capture, annotate=annotate_points,
+                                         jpeg_quality=jpeg_quality, max_width=stream_width,
+                                         target_fps=target_fps,
+                                         stabilizer=PredictionStabilizer(),
+                                         idle_timeout=idle_timeout)
+            self.stations[station_id] = {'source': source, 'worker': worker, 'service': service}
+
+    def _local_classifier(self, classifier_name, model_path):
+        """In-process recognizer; trained ones share the first one's scheduler"""
+        classifier = build_classifier(classifier_name, model_path, scheduler=self.scheduler)
+        if self.scheduler is None and getattr(classifier, 'model', None) is not None:
+            # classify_batch() keeps no per-stream state, so any station's
+            # classifier can run the batches for all of them
+            self.scheduler = InferenceScheduler(classifier)
+            classifier.scheduler = self.scheduler
+        return classifier
+
+    def start(self):
+        if self.scheduler is not None:
+            self.scheduler.start()
+        if self.pool is not None:
+            self.pool.warm_up()
+        for station in self.stations.values():
+            station['service'].start()
+        return self
+
+    def stop(self):
+        for station in self.stations.values():
+            station['service'].stop()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def service(self, station_id):
+        """RecognitionService of a station; KeyError if there is none"""
+        return self.stations[station_id]['service']
+
+    def describe(self):
+        """Status of every station for the /stations listing"""
+        listing = []
+        for station_id, station in self.stations.items():
+            service = station['service']
+            letter, confidence = service.latest_prediction()
+            listing.append({
+                'id': station_id,
+                'source': str(station['source']),
+                'worker': station['worker'],
+                'running': service.running,
+                'letter': letter,
+                'confidence': round(float(confidence), 3),
+                'frames_encoded': service.frames_encoded,
+            })
+        return listing
+
+def create_app(server):
+    """Flask app with app.py's routes, one set per station"""
+    app = Flask(__name__)
+
+    def station_service(station_id):
+        try:
+            return server.service(station_id)
+        except KeyError:
+            abort(404)
+
+    @app.route('/stations')
+    def stations():
+        """All stations and their latest predictions"""
+        return jsonify(server.describe())
+
+    @app.route('/scheduler')
+    def scheduler():
+        """Batching counters of the shared scheduler (--in-process only)"""
+        if server.scheduler is None:
+            abort(404)
+        return jsonify(server.scheduler.stats())
+
+    @app.route('/stations/<station_id>/video_feed')
+    def video_feed(station_id):
+        """Video streaming route"""
+        service = station_service(station_id)
+        max_fps = request.args.get('fps', type=float)
+        return Response(mjpeg_stream(service, max_fps=max_fps),
+                        mimetype='multipart/x-mixed-replace; boundary=frame')
+
+    @app.route('/stations/<station_id>/get_letter')
+    def get_letter(station_id):
+        """Current letter and confidence of one station"""
+        letter, confidence = station_service(station_id).latest_prediction()
+        return jsonify({'letter': letter, 'confidence': confidence})
+
+    @app.route('/stations/<station_id>/letter_stream')
+    def letter_stream(station_id):
+        """Server-Sent Events stream of prediction changes (?rate= max events/sec)"""
+        service = station_service(station_id)
+        max_rate = request.args.get('rate', default=10.0, type=float)
+        return Response(prediction_events(service, max_rate=max_rate),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        """Per-stage latencies and frame counters (all stations) in Prometheus text format"""
+        return Response(metrics.prometheus_text(),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve ASL recognition for several stations')
+    parser.add_argument('sources', nargs='+',
+                        help='Camera indices, video files or stream URLs, one per station')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Recognition worker processes (0 = one per CPU core)')
+    parser.add_argument('--classifier', choices=CLASSIFIER_NAMES, default='trained',
+                        help='Recognizer to run in the workers')
+    parser.add_argument('--model', default=None, help='Model bundle for the trained classifier')
+    parser.add_argument('--replay', action='store_true',
+                        help='Loop video files in real time, as stand-ins for live cameras')
+    parser.add_argument('--detect-width', type=int, default=640,
+                        help='Downscale wider frames before sending them to a worker')
+    parser.add_argument('--idle-timeout', type=float, default=0,
+                        help='Release a station camera after this many seconds without '
+                             'viewers (0 = recognize continuously)')
+    parser.add_argument('--in-process', action='store_true',
+                        help='Run stations on threads in this process, batching the trained '
+                             'model across stations')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    sources = [parse_source(source) for source in args.sources]
+    server = StationServer(sources, args.workers, args.classifier, args.model,
+                           replay=args.replay, detect_width=args.detect_width,
+                           idle_timeout=args.idle_timeout or None, in_process=args.in_process)
+    if server.pool is not None:
+        print(f"Starting {len(sources)} stations on {len(server.pool)} workers...")
+    else:
+        print(f"Starting {len(sources)} stations in process"
+              f"{' with a shared inference scheduler' if server.scheduler else ''}...")
+    server.start()
+    for station in server.describe():
+        placement = 'in process' if station['worker'] is None else f"worker {station['worker']}"
+        print(f"  station {station['id']}: {station['source']} ({placement}) → "
+              f"http://localhost:{args.port}/stations/{station['id']}/video_feed")
+    try:
+        create_app(server).run(host=args.host, port=args.port, threaded=True)
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
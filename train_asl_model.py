@@ -9,63 +9,174 @@ import numpy as np
 import mediapipe as mp
 import os
 import pickle
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
 from sklearn.metrics import accuracy_score, classification_report
 import matplotlib.pyplot as plt
 from pathlib import Path
+from landmark_cache import LandmarkCache
+from forest_engine import compile_forest
+from model_bundle import save_model_bundle
+from landmark_features import (NORMALIZED_FEATURES_VERSION, RAW_FEATURES_VERSION,
+                               compute_features, feature_names, feature_spec)
+from landmark_dataset import LandmarkDataset, LandmarkDatasetWriter
+
+# MediaPipe settings shared by the trainer and the extraction workers
+HANDS_CONFIG = {
+    'model_complexity': 0,
+    'min_detection_confidence': 0.5,
+    'min_tracking_confidence': 0.5,
+    'max_num_hands': 1,
+}
+
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+
+# Result of an image that could not be read or processed, unlike None
+# ("no hand"), it is not cached, so the image is tried again next run
+EXTRACTION_FAILED = False
+
+def extract_image_landmarks(hands, image_path):
+    """Extract (landmarks, is_left) from an image with the given Hands instance
+
+    Returns None when no hand is found and EXTRACTION_FAILED on errors.
+    """
+    try:
+        # Read image
+        image = cv2.imread(image_path)
+        if image is None:
+            print(f"Could not read {image_path}")
+            return EXTRACTION_FAILED
+            
+        # Convert BGR to RGB
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        
+        # Process with MediaPipe
+        results = hands.process(rgb_image)
+        
+        if results.multi_hand_landmarks:
+            # Get the first detected hand
+            hand_landmarks = results.multi_hand_landmarks[0]
+            
+            # Extract all landmark coordinates
+            landmarks = []
+            for landmark in hand_landmarks.landmark:
+                landmarks.extend([landmark.x, landmark.y, landmark.z])
+            
+            # MediaPipe's handedness, so left hands can be mirrored at train time
+            left = False
+            if results.multi_handedness:
+                left = results.multi_handedness[0].classification[0].label == 'Left'
+            
+            return np.array(landmarks), left
+        else:
+            return None
+            
+    except Exception as e:
+        print(f"Error processing {image_path}: {e}")
+        return EXTRACTION_FAILED
+
+# Each extraction worker process owns one Hands instance
+_worker_hands = None
+
+def _init_extraction_worker():
+    """Create the MediaPipe Hands instance for this worker process"""
+    global _worker_hands
+    _worker_hands = mp.solutions.hands.Hands(**HANDS_CONFIG)
+
+def _extract_chunk(image_paths):
+    """Extract landmarks for a chunk of images inside a worker process"""
+    return [extract_image_landmarks(_worker_hands, path) for path in image_paths]
+
+def resolve_worker_count(workers):
+    """Map a requested worker count to a concrete one (0/None = all cores)"""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
 
 class ASLModelTrainer:
-    def __init__(self):
+    def __init__(self, feature_version=NORMALIZED_FEATURES_VERSION, n_estimators=300,
+                 mirror=False):
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            model_complexity=0,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-            max_num_hands=1
-        )
+        self.hands = self.mp_hands.Hands(**HANDS_CONFIG)
         # Use class_weight='balanced' to mitigate class-imbalance during training
         self.model = RandomForestClassifier(
-            n_estimators=300,
+            n_estimators=n_estimators,
             random_state=42,
             class_weight="balanced"
         )
+        # Raw landmarks are stored; the feature transform runs at train time
+        self.feature_version = feature_version
+        # Mirror left hands so both hands share one model (normalized features only)
+        self.mirror = bool(mirror and feature_version != RAW_FEATURES_VERSION)
         self.features = []
         self.labels = []
+        # Per-sample "left hand" flags; None for datasets written without them
+        self.left = None
         
+    def detector_settings(self):
+        """Everything that influences extraction output, used as the cache key"""
+        return {'hands': HANDS_CONFIG, 'mediapipe': mp.__version__}
+    
     def extract_landmarks(self, image_path):
-        """Extract hand landmarks from an image"""
+        """(landmarks, is_left) for an image, None without a hand"""
+        return extract_image_landmarks(self.hands, image_path)
+    
+    def iter_landmarks(self, image_paths, workers=1, chunk_size=64):
+        """Yield each image's extract_image_landmarks() result, in input order"""
+        if workers <= 1 or len(image_paths) <= chunk_size:
+            for image_path in image_paths:
+                yield self.extract_landmarks(image_path)
+            return
+        
+        # Fan chunks out to worker processes; map() keeps results in input order.
+        # Workers are spawned, not forked: MediaPipe is not fork-safe once the
+        # parent has created its own Hands graph.
+        chunks = [image_paths[i:i + chunk_size]
+                  for i in range(0, len(image_paths), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_extraction_worker) as executor:
+            for chunk_result in executor.map(_extract_chunk, chunks):
+                yield from chunk_result
+    
+    def iter_cached_landmarks(self, image_paths, cache, workers=1, chunk_size=64):
+        """Like iter_landmarks(), running MediaPipe only on cache misses"""
+        # Images that could not be hashed get a None key and are skipped
+        keys = cache.keys_for(image_paths)
+        cached = [cache.lookup(key) for key in keys]
+        
+        missing = [path for path, key, (hit, _) in zip(image_paths, keys, cached)
+                   if key is not None and not hit]
+        unreadable = keys.count(None)
+        print(f"Landmark cache: {len(image_paths) - len(missing) - unreadable} hits, "
+              f"{len(missing)} images to extract, {unreadable} unreadable")
+        
+        extracted = self.iter_landmarks(missing, workers, chunk_size)
         try:
-            # Read image
-            image = cv2.imread(image_path)
-            if image is None:
-                return None
-                
-            # Convert BGR to RGB
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # Process with MediaPipe
-            results = self.hands.process(rgb_image)
-            
-            if results.multi_hand_landmarks:
-                # Get the first detected hand
-                hand_landmarks = results.multi_hand_landmarks[0]
-                
-                # Extract all landmark coordinates
-                landmarks = []
-                for landmark in hand_landmarks.landmark:
-                    landmarks.extend([landmark.x, landmark.y, landmark.z])
-                
-                return np.array(landmarks)
-            else:
-                return None
-                
-        except Exception as e:
-            print(f"Error processing {image_path}: {e}")
-            return None
+            for key, (hit, sample) in zip(keys, cached):
+                if key is None:
+                    sample = EXTRACTION_FAILED
+                elif not hit:
+                    sample = next(extracted)
+                    if sample is not EXTRACTION_FAILED:
+                        cache.put(key, sample)
+                yield sample
+        finally:
+            cache.save()
     
-    def load_dataset(self, dataset_path):
-        """Load and process all images from the dataset folder"""
+    def load_dataset(self, dataset_path, workers=1, chunk_size=64, cache_path=None,
+                     dataset_dir=None):
+        """Load and process all images from the dataset folder
+
+        workers > 1 extracts landmarks in a process pool (0/None = all cores).
+        With cache_path, results are reused for images seen in earlier runs.
+        With dataset_dir, the landmark matrix is written to a memory-mapped
+        dataset folder that load_features() can reopen later.
+        """
         print(f"Loading dataset from: {dataset_path}")
         
         dataset_path = Path(dataset_path)
@@ -74,10 +185,9 @@ class ASLModelTrainer:
             return False
         
         # Find all image files
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
         image_files = []
         
-        for ext in image_extensions:
+        for ext in IMAGE_EXTENSIONS:
             image_files.extend(dataset_path.rglob(f"*{ext}"))
             # On Windows the filesystem is case-insensitive; adding the upper-case
             # variant creates duplicates. To be safe we still query but we will
@@ -101,25 +211,62 @@ class ASLModelTrainer:
             print("No image files found!")
             return False
         
-        # Process each image
-        processed_count = 0
+        # Try to extract letter from filename or folder structure
+        labeled_paths = []
+        labeled_letters = []
         for image_path in image_files:
-            # Try to extract letter from filename or folder structure
             letter = self.extract_letter_from_path(image_path, dataset_path)
-            
             if letter:
-                landmarks = self.extract_landmarks(str(image_path))
-                if landmarks is not None:
-                    self.features.append(landmarks)
-                    self.labels.append(letter)
-                    processed_count += 1
-                    
-                    if processed_count % 10 == 0:
-                        print(f"Processed {processed_count} images...")
+                labeled_paths.append(str(image_path))
+                labeled_letters.append(letter)
+        
+        workers = resolve_worker_count(workers)
+        if workers > 1:
+            print(f"Extracting landmarks with {workers} worker processes")
+        
+        # Rows go straight into a preallocated float32 (N, 63) matrix
+        writer = LandmarkDatasetWriter(dataset_dir, len(labeled_paths))
+        
+        # Process each image
+        processed_count = 0
+        if cache_path:
+            cache = LandmarkCache(cache_path, self.detector_settings())
+            landmark_stream = self.iter_cached_landmarks(
+                labeled_paths, cache, workers, chunk_size)
+        else:
+            landmark_stream = self.iter_landmarks(labeled_paths, workers, chunk_size)
+        for image_path, letter, sample in zip(labeled_paths, labeled_letters,
+                                              landmark_stream):
+            # None is "no hand", EXTRACTION_FAILED an unreadable image
+            if sample:
+                landmarks, left = sample
+                writer.append(landmarks, letter, image_path, left)
+                processed_count += 1
+                
+                if processed_count % 10 == 0:
+                    print(f"Processed {processed_count} images...")
+        
+        writer.close()
+        self.features, self.labels = writer.view()
+        self.left = writer.left[:writer.count]
         
         print(f"Successfully processed {processed_count} images")
+        if dataset_dir:
+            print(f"Landmark dataset written to: {dataset_dir}")
         return processed_count > 0
     
+    def load_features(self, dataset_dir):
+        """Use a landmark dataset folder written by load_dataset()"""
+        try:
+            dataset = LandmarkDataset(dataset_dir)
+            self.features, self.labels, self.left = dataset.features, dataset.labels, dataset.left
+        except Exception as e:
+            print(f"Error loading landmark dataset: {e}")
+            return False
+        
+        print(f"Loaded {len(self.labels)} samples from: {dataset_dir}")
+        return len(self.labels) > 0
+    
     def extract_letter_from_path(self, image_path, dataset_root):
         """Extract ASL letter from image path based on directory structure or filename.
 
@@ -157,23 +304,28 @@ class ASLModelTrainer:
         if len(self.features) == 0:
             print("No features to train on!")
             return False
+        if self.mirror and self.left is None:
+            print("Mirroring needs handedness, which this landmark dataset lacks; "
+                  "extract it again from the images")
+            return False
         
         print(f"\nTraining model on {len(self.features)} samples...")
         
-        # Convert to numpy arrays
-        X = np.array(self.features)
-        y = np.array(self.labels)
+        # Derive model features from the raw landmark matrix
+        X = self.model_features()
+        y = np.asarray(self.labels)
         
-        # Split into training and testing sets
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
+        # Split row indices into training and testing sets
+        train_idx, test_idx = train_test_split(
+            np.arange(len(y)), test_size=0.2, random_state=42, stratify=y
         )
+        y_test = y[test_idx]
         
         # Train the model
-        self.model.fit(X_train, y_train)
+        self.model.fit(X[train_idx], y[train_idx])
         
         # Evaluate the model
-        y_pred = self.model.predict(X_test)
+        y_pred = self.model.predict(X[test_idx])
         accuracy = accuracy_score(y_test, y_pred)
         
         print(f"\nModel Accuracy: {accuracy:.3f}")
@@ -188,18 +340,52 @@ class ASLModelTrainer:
         
         return True
     
-    def save_model(self, model_path="asl_model.pkl"):
-        """Save the trained model"""
-        model_data = {
-            'model': self.model,
-            'feature_names': [f'landmark_{i}' for i in range(len(self.features[0]))],
-            'classes': list(self.model.classes_)
-        }
+    def model_features(self):
+        """Feature matrix for the configured feature version"""
+        if self.feature_version == RAW_FEATURES_VERSION:
+            # No copy for array/memmap datasets
+            return np.asarray(self.features, dtype=np.float32)
+        return compute_features(self.features, self.feature_version,
+                                self.left if self.mirror else None)
+    
+    def cross_validate(self, folds=5):
+        """Report stratified k-fold accuracy on the loaded features"""
+        X = self.model_features()
+        y = np.asarray(self.labels)
         
-        with open(model_path, 'wb') as f:
-            pickle.dump(model_data, f)
+        print(f"\nRunning {folds}-fold cross-validation...")
+        cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+        scores = cross_val_score(clone(self.model), X, y, cv=cv)
+        print(f"Cross-validation accuracy: {scores.mean():.3f} (+/- {scores.std():.3f})")
+        return scores
+    
+    def save_model(self, model_path="asl_model.bundle", pickle_path=None):
+        """Save the trained model as a bundle (and optionally a legacy pickle)"""
+        names = feature_names(self.feature_version)
+        metadata = {
+            'feature_names': names,
+            'features': feature_spec(self.feature_version, self.mirror),
+            'detector': self.detector_settings(),
+            'estimator': {
+                'type': type(self.model).__name__,
+                'n_estimators': self.model.n_estimators,
+            },
+        }
+        save_model_bundle(model_path, compile_forest(self.model), metadata)
+        print(f"Model bundle saved to: {model_path}")
         
-        print(f"Model saved to: {model_path}")
+        if pickle_path:
+            model_data = {
+                'model': self.model,
+                'feature_names': names,
+                'features': feature_spec(self.feature_version, self.mirror),
+                'classes': list(self.model.classes_)
+            }
+            
+            with open(pickle_path, 'wb') as f:
+                pickle.dump(model_data, f)
+            
+            print(f"Legacy pickle saved to: {pickle_path}")
     
     def load_model(self, model_path="asl_model.pkl"):
         """Load a trained model"""
@@ -214,18 +400,58 @@ class ASLModelTrainer:
             print(f"Error loading model: {e}")
             return False
 
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Train the ASL letter model")
+    parser.add_argument("dataset", nargs="?", default=r"C:\Users\chris\Downloads\archive",
+                        help="Folder with reference ASL images")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Landmark extraction processes (0 = all cores)")
+    parser.add_argument("--chunk-size", type=int, default=64,
+                        help="Images handed to a worker at a time")
+    parser.add_argument("--cache", default="landmark_cache.npz",
+                        help="Landmark cache file reused between runs")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always rerun hand detection")
+    parser.add_argument("--dataset-dir",
+                        help="Write extracted landmarks to this dataset folder")
+    parser.add_argument("--from-dataset",
+                        help="Train from a landmark dataset folder instead of images")
+    parser.add_argument("--cv", type=int, default=0,
+                        help="Also run k-fold cross-validation with this many folds")
+    parser.add_argument("--features", choices=["normalized", "raw"], default="normalized",
+                        help="Feature set: wrist-relative normalized (default) or raw coordinates")
+    parser.add_argument("--mirror", action="store_true",
+                        help="Mirror left hands so one model serves both (normalized features)")
+    parser.add_argument("--trees", type=int, default=300,
+                        help="Number of trees in the random forest")
+    parser.add_argument("--model-out", default="asl_model.bundle",
+                        help="Model bundle folder to write")
+    parser.add_argument("--pickle",
+                        help="Also write a legacy sklearn pickle to this path")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    
     print("ASL Model Training")
     print("=" * 40)
     
     # Initialize trainer
-    trainer = ASLModelTrainer()
-    
-    # Dataset path
-    dataset_path = r"C:\Users\chris\Downloads\archive"
+    feature_version = (RAW_FEATURES_VERSION if args.features == "raw"
+                       else NORMALIZED_FEATURES_VERSION)
+    trainer = ASLModelTrainer(feature_version=feature_version, n_estimators=args.trees,
+                              mirror=args.mirror)
     
     # Load dataset
-    if not trainer.load_dataset(dataset_path):
+    if args.from_dataset:
+        loaded = trainer.load_features(args.from_dataset)
+    else:
+        cache_path = None if args.no_cache else args.cache
+        loaded = trainer.load_dataset(args.dataset, workers=args.workers,
+                                      chunk_size=args.chunk_size, cache_path=cache_path,
+                                      dataset_dir=args.dataset_dir)
+    if not loaded:
         print("Failed to load dataset!")
         return
     
@@ -234,8 +460,11 @@ def main():
         print("Failed to train model!")
         return
     
+    if args.cv > 1:
+        trainer.cross_validate(args.cv)
+    
     # Save model
-    trainer.save_model()
+    trainer.save_model(args.model_out, pickle_path=args.pickle)
     
     print("\nTraining completed!")
     print("You can now use the trained model with the recognition script.")
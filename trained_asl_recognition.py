@@ -3,14 +3,27 @@
 Trained ASL Recognition - Uses machine learning model for better accuracy
 """
 
+import argparse
 import cv2
 import numpy as np
 import mediapipe as mp
 import pickle
 import os
+import time
+from forest_engine import compile_forest
+from model_bundle import load_model_bundle
+from landmark_features import (RAW_FEATURES_VERSION, feature_spec, features_from_spec,
+                               landmarks_to_array)
+from frame_pipeline import FramePipeline
+from landmark_gate import LandmarkDeltaGate
+from stage_metrics import metrics, PeriodicReporter
+from letter_rules import FALLBACK_TABLE
+from prediction_smoother import PredictionStabilizer
+
+DEFAULT_MODEL_PATH = "asl_model.bundle"
 
 class TrainedASLClassifier:
-    def __init__(self, model_path="asl_model.pkl"):
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, gate_tolerance=0.01, scheduler=None):
         self.mp_hands = mp.solutions.hands
         self.hands = self.mp_hands.Hands(
             model_complexity=0,
@@ -21,21 +34,54 @@ class TrainedASLClassifier:
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
         
+        # Reuse the last prediction while the hand holds still (None disables)
+        self.gate = LandmarkDeltaGate(gate_tolerance) if gate_tolerance else None
+        # Optional InferenceScheduler shared with other streams; rows are
+        # then classified in its micro-batches instead of one by one. A row
+        # not classified within scheduler_timeout seconds falls back to the rules
+        self.scheduler = scheduler
+        self.scheduler_timeout = 0.5
+        # Class probabilities (ordered like self.classes) behind the last
+        # process_frame() result; None without a hand or from the fallback rules
+        self.last_proba = None
+        
         # Load trained model
         self.model = None
         self.classes = []
+        self.metadata = {}
+        self.feature_spec = feature_spec(RAW_FEATURES_VERSION)
         self.load_model(model_path)
         
     def load_model(self, model_path):
-        """Load the trained machine learning model"""
+        """Load the trained machine learning model
+        
+        model_path is a model bundle folder written by train_asl_model.py.
+        If it is missing, a legacy pickle (<model>.pkl) is loaded instead and
+        its forest compiled in memory.
+        """
         try:
-            if os.path.exists(model_path):
-                with open(model_path, 'rb') as f:
+            start = time.perf_counter()
+            legacy_path = os.path.splitext(model_path)[0] + '.pkl'
+            if os.path.isdir(model_path):
+                self.model, self.metadata = load_model_bundle(model_path)
+                self.classes = self.metadata['classes']
+                self.feature_spec = self.metadata['features']
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                print(f"✓ Model bundle loaded from {model_path} ({elapsed_ms:.0f} ms)")
+                print(f"✓ Supported letters: {', '.join(self.classes)}")
+                return True
+            elif os.path.exists(legacy_path):
+                # Unpickling runs arbitrary code; only do it for our own legacy files
+                with open(legacy_path, 'rb') as f:
                     model_data = pickle.load(f)
                 
                 self.model = model_data['model']
+                if hasattr(self.model, 'estimators_'):
+                    self.model = compile_forest(self.model)
                 self.classes = model_data['classes']
-                print(f"✓ Trained model loaded from {model_path}")
+                self.feature_spec = model_data.get('features', feature_spec(RAW_FEATURES_VERSION))
+                print(f"✓ Legacy model loaded from {legacy_path}")
+                print("  Retrain with train_asl_model.py to get a model bundle")
                 print(f"✓ Supported letters: {', '.join(self.classes)}")
                 return True
             else:
@@ -52,88 +98,105 @@ class TrainedASLClassifier:
         if not landmarks:
             return None
         
-        # Extract all landmark coordinates
-        features = []
-        for landmark in landmarks.landmark:
-            features.extend([landmark.x, landmark.y, landmark.z])
+        # All 21 landmark coordinates as one (1, 63) row
+        return landmarks_to_array(landmarks).reshape(1, -1)
+    
+    def classify_batch(self, landmark_matrix, handedness=None, return_proba=False):
+        """Classify an (N, 63) landmark matrix with a single predict_proba pass
+        
+        Raw landmarks go through the same feature transform the model was
+        trained with. Returns (letters, confidences) arrays of length N, plus
+        the (N, classes) probability matrix with return_proba.
+        """
+        if self.model is None:
+            raise RuntimeError("No trained model loaded")
+        
+        with metrics.time('features'):
+            features = features_from_spec(landmark_matrix, self.feature_spec, handedness)
         
-        return np.array(features).reshape(1, -1)
+        # predict() is argmax over predict_proba, so one pass gives both
+        with metrics.time('predict_proba'):
+            probabilities = self.model.predict_proba(features)
+        best = probabilities.argmax(axis=1)
+        letters = self.model.classes_[best]
+        confidences = probabilities[np.arange(len(best)), best]
+        if return_proba:
+            return letters, confidences, probabilities
+        return letters, confidences
     
-    def is_finger_extended(self, landmarks, finger_tip_idx, finger_pip_idx):
-        """Check if a finger is extended (fallback method)"""
-        tip = landmarks[finger_tip_idx]
-        pip = landmarks[finger_pip_idx]
-        return tip.y < pip.y
+    def classify_landmarks(self, features, handedness=None):
+        """Classify one (1, 63) landmark row, reusing the cached result if the hand held still"""
+        if self.gate is not None:
+            cached = self.gate.lookup(features, handedness)
+            if cached is not None:
+                metrics.count('gate_hits')
+                letter, confidence, self.last_proba = cached
+                return letter, confidence
+        
+        proba = None
+        if self.scheduler is not None:
+            letter, confidence = self.scheduler.classify(features, handedness,
+                                                         timeout=self.scheduler_timeout)
+        else:
+            letters, confidences, probabilities = self.classify_batch(
+                features, handedness, return_proba=True)
+            letter, confidence, proba = str(letters[0]), float(confidences[0]), probabilities[0]
+        if self.gate is not None:
+            self.gate.store(features, handedness, (letter, confidence, proba))
+        self.last_proba = proba
+        return letter, confidence
     
     def classify_letter_fallback(self, landmarks):
-        """Fallback rule-based classification"""
-        if not landmarks:
-            return "None", 0.0
-            
-        # Get finger states
-        thumb_extended = self.is_finger_extended(landmarks, 4, 3)
-        index_extended = self.is_finger_extended(landmarks, 8, 6)
-        middle_extended = self.is_finger_extended(landmarks, 12, 10)
-        ring_extended = self.is_finger_extended(landmarks, 16, 14)
-        pinky_extended = self.is_finger_extended(landmarks, 20, 18)
+        """Fallback rule-based classification (letter_rules.FALLBACK_RULES)
         
-        # Enhanced ASL letter classification
-        if thumb_extended and not any([index_extended, middle_extended, ring_extended, pinky_extended]):
-            return "A", 0.8
-        elif all([index_extended, middle_extended, ring_extended, pinky_extended]) and not thumb_extended:
-            return "B", 0.8
-        elif not any([index_extended, middle_extended, ring_extended, pinky_extended, thumb_extended]):
-            # Check for C shape (curved fingers)
-            return "C", 0.7
-        elif index_extended and not any([middle_extended, ring_extended, pinky_extended, thumb_extended]):
-            return "D", 0.8
-        elif not any([index_extended, middle_extended, ring_extended, pinky_extended, thumb_extended]):
-            return "E", 0.8
-        elif index_extended and middle_extended and not any([ring_extended, pinky_extended, thumb_extended]):
-            return "U", 0.8
-        elif index_extended and middle_extended and ring_extended and not any([pinky_extended, thumb_extended]):
-            return "W", 0.8
-        elif pinky_extended and not any([index_extended, middle_extended, ring_extended, thumb_extended]):
-            return "I", 0.8
-        elif thumb_extended and pinky_extended and not any([index_extended, middle_extended, ring_extended]):
-            return "Y", 0.8
-        elif not any([index_extended, middle_extended, ring_extended, pinky_extended, thumb_extended]):
-            return "S", 0.8
-        else:
-            return "None", 0.3
+        landmarks may be the landmark list or an already converted array.
+        A finger counts as extended when its tip is above its PIP joint.
+        """
+        if landmarks is None or len(landmarks) == 0:
+            return "None", 0.0
+        return FALLBACK_TABLE.classify_points(landmarks_to_array(landmarks))
     
-    def classify_letter(self, landmarks):
+    def classify_letter(self, landmarks, handedness=None):
         """Classify ASL letter using trained model or fallback"""
         if not landmarks:
             return "None", 0.0
         
+        # One conversion serves both the model and the fallback rules
+        with metrics.time('extract_landmarks'):
+            features = self.extract_landmarks(landmarks)
+        
         # Try trained model first
         if self.model is not None:
             try:
-                features = self.extract_landmarks(landmarks)
-                if features is not None:
-                    prediction = self.model.predict(features)[0]
-                    confidence = np.max(self.model.predict_proba(features))
-                    return prediction, confidence
+                return self.classify_landmarks(features, handedness)
             except Exception as e:
                 print(f"Model prediction failed: {e}")
         
         # Fallback to rule-based classification
-        return self.classify_letter_fallback(landmarks.landmark)
+        return self.classify_letter_fallback(features)
     
     def process_frame(self, frame):
         """Process a frame and return classification results"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_frame)
+        self.last_proba = None
+        with metrics.time('cvt_color'):
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with metrics.time('hands_process'):
+            results = self.hands.process(rgb_frame)
         
         if results.multi_hand_landmarks:
             hand_landmarks = results.multi_hand_landmarks[0]
-            letter, confidence = self.classify_letter(hand_landmarks)
+            handedness = None
+            if results.multi_handedness:
+                handedness = results.multi_handedness[0].classification[0].label
+            letter, confidence = self.classify_letter(hand_landmarks, handedness)
             return letter, confidence, hand_landmarks
         else:
+            # A hand that comes back is always classified afresh
+            if self.gate is not None:
+                self.gate.reset()
             return "None", 0.0, None
 
-def main():
+def main(metrics_interval=0):
     print("Trained ASL Recognition - Enhanced Version")
     print("Press 'q' to quit, 's' to save image")
     print("=" * 50)
@@ -150,52 +213,54 @@ def main():
     
     print("Camera opened successfully!")
     print("Make ASL signs in front of the camera...")
+    # Optional periodic latency/FPS summary on the console
+    reporter = PeriodicReporter(metrics, metrics_interval)
+    
+    # Only stable letter changes are reported. Forest probabilities are
+    # spread over many letters, so enter and leave lower than the defaults
+    stabilizer = PredictionStabilizer(classes=classifier.classes,
+                                      enter_threshold=0.4, exit_threshold=0.25)
+    last_frame_id = -1
     
-    # For tracking letter changes
-    last_letter = "None"
-    letter_count = 0
+    # Capture and classification run on their own threads; this loop renders
+    pipeline = FramePipeline(classifier, cap).start()
     
     try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                print("Error: Could not read frame")
-                break
-            
-            # Process frame
-            letter, confidence, hand_landmarks = classifier.process_frame(frame)
+        for frame, prediction in pipeline.frames():
+            letter, confidence, hand_landmarks = prediction[:3]
             
             # Draw landmarks if hand detected
             if hand_landmarks:
-                classifier.mp_drawing.draw_landmarks(
-                    frame,
-                    hand_landmarks,
-                    classifier.mp_hands.HAND_CONNECTIONS,
-                    classifier.mp_drawing_styles.get_default_hand_landmarks_style(),
-                    classifier.mp_drawing_styles.get_default_hand_connections_style()
-                )
+                with metrics.time('draw_landmarks'):
+                    classifier.mp_drawing.draw_landmarks(
+                        frame,
+                        hand_landmarks,
+                        classifier.mp_hands.HAND_CONNECTIONS,
+                        classifier.mp_drawing_styles.get_default_hand_landmarks_style(),
+                        classifier.mp_drawing_styles.get_default_hand_connections_style()
+                    )
             
             # Add text overlay
-            cv2.putText(frame, f"Letter: {letter}", (10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.putText(frame, f"Confidence: {confidence:.2f}", (10, 70),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.putText(frame, "Press 'q' to quit", (10, 110),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            with metrics.time('put_text'):
+                cv2.putText(frame, f"Letter: {letter}", (10, 30),
+                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                cv2.putText(frame, f"Confidence: {confidence:.2f}", (10, 70),
+                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                cv2.putText(frame, "Press 'q' to quit", (10, 110),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
             
             # Show frame
-            cv2.imshow('Trained ASL Recognition', frame)
+            with metrics.time('imshow'):
+                cv2.imshow('Trained ASL Recognition', frame)
+            metrics.count('frames_displayed')
+            reporter.poll()
             
-            # Print to console when letter changes
-            if letter != "None" and letter != last_letter:
-                print(f"Detected: {letter} (confidence: {confidence:.2f})")
-                last_letter = letter
-                letter_count = 0
-            elif letter == last_letter and letter != "None":
-                letter_count += 1
-                if letter_count == 30:  # Print every ~1 second
-                    print(f"Holding: {letter} (confidence: {confidence:.2f})")
-                    letter_count = 0
+            # Print to console when the stable letter changes
+            if prediction.frame_id != last_frame_id:
+                last_frame_id = prediction.frame_id
+                event = stabilizer.update(letter, confidence, proba=prediction.proba)
+                if event and event.letter != "None":
+                    print(f"Detected: {event.letter} (confidence: {event.confidence:.2f})")
             
             # Handle key presses
             key = cv2.waitKey(1) & 0xFF
@@ -205,14 +270,26 @@ def main():
                 filename = f"asl_{letter}_{confidence:.2f}.jpg"
                 cv2.imwrite(filename, frame)
                 print(f"Saved: {filename}")
+        
+        if pipeline.capture_failed:
+            print("Error: Could not read frame")
     
     except KeyboardInterrupt:
         print("\nInterrupted by user")
     
     finally:
+        pipeline.stop()
         cap.release()
         cv2.destroyAllWindows()
         print("Camera released")
+        if classifier.gate is not None:
+            gate = classifier.gate
+            print(f"Classification cache: {gate.hits}/{gate.hits + gate.misses} hits "
+                  f"({gate.hit_rate:.0%})")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--metrics", type=float, default=0, metavar="SECONDS",
+                        help="Print a latency/FPS summary every SECONDS (0 = off)")
+    args = parser.parse_args()
+    main(metrics_interval=args.metrics) 
\ No newline at end of file